@@ -1,68 +1,215 @@
-from flask import Flask, request, jsonify, render_template
-import pandas as pd
+from flask import Flask, Response, g, request, jsonify, render_template, stream_with_context, url_for
+import click
+import cProfile
+import contextvars
+import gzip
+import hashlib
+import io
+import itertools
+import pstats
 import random
-import os, csv, requests, json
+import os
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from werkzeug.http import is_resource_modified
+
+from llm import LLMError, get_groq_response, get_groq_responses, stream_groq_response, prompt_cache, client as llm_client
+from catalog import CourseCatalog
+from storage import get_storage, migrate_csv_to_sqlite, psych_column, CsvStorage, SqliteStorage, UserExistsError, DATA_DIR, DB_PATH
+import chat_context
+import descriptions
+import jobs
+import metrics
+import questions
+import recommender
+from predictor import GradePredictor, format_predictions
+from descriptions import describe_courses
+
+try:
+    import brotli
+except ImportError:  # optional; responses are gzipped instead
+    brotli = None
 
 app = Flask(__name__, static_url_path='', static_folder='static', template_folder='templates')
 
+criteria = [
+    "Analytical Thinking",
+    "Creativity",
+    "Logical Reasoning",
+    "Problem-Solving",
+    "Decision-Making",
+    "Emotional Resilience",
+    "Motivation",
+    "Curiosity",
+    "Attention to Detail",
+    "Communication Skills",
+    "Collaboration",
+    "Risk-Taking",
+    "Self-Discipline",
+    "Learning Style Preference",
+    "Adaptability"
+]
 
-def load_users():
-    users = {}
-    filename = 'users.csv'
-    if os.path.exists(filename):
-        with open(filename, mode='r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                username = row["username"]
-                users[username] = row
-    return users
-
-def save_user(user_data):
-    filename = 'users.csv'
-    file_exists = os.path.exists(filename)
-    with open(filename, mode='a', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['username', 'password', 'name', 'age', 'discipline', 'current_semester', 'career_goal']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(user_data)
-
-
-def save_history(history_record):
-    filename = 'history.csv'
-    file_exists = os.path.exists(filename)
-    with open(filename, mode='a', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['username', 'subject_code', 'grade', 'attendance', 'semester']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(history_record)
-
-
-def save_recommendation(rec):
-    filename = 'recommendations.csv'
-    file_exists = os.path.exists(filename)
-    with open(filename, mode='a', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['username', 'semester', 'recommended_courses']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(rec)
-
-
-courses = pd.read_csv('courses.csv', comment='/', skipinitialspace=True)
-courses['Semester'] = pd.to_numeric(courses['Semester'], errors='coerce')
-courses['Credits'] = pd.to_numeric(courses['Credits'], errors='coerce')
+# Every storage and catalog call is timed as a span of the current request
+storage = metrics.Instrumented(get_storage(psych_columns=criteria), "storage")
+
+# Ask the LLM to reword the locally computed recommendation reasons
+RECOMMENDATION_LLM_EXPLANATIONS = os.environ.get("EDUSYNC_RECOMMEND_LLM_EXPLANATIONS", "0") == "1"
+# Routes whose LLM answers may be shared between identical prompts
+PROMPT_CACHE_ROUTES = set(filter(None, os.environ.get(
+    "EDUSYNC_PROMPT_CACHE_ROUTES", "recommend_courses,generate_skill_chart,chat_with_ai"
+).split(",")))
+# Largest page /get_history returns, and rows joined per batch when streaming
+HISTORY_PAGE_LIMIT = int(os.environ.get("EDUSYNC_HISTORY_PAGE_LIMIT", "1000"))
+HISTORY_STREAM_BATCH = 500
+# Results per page of a ranked course search, by default and at most
+COURSE_PAGE_SIZE = 20
+MAX_COURSE_PAGE_SIZE = 100
+# Threads per process for loading the pieces of /dashboard_state side by side
+dashboard_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("EDUSYNC_DASHBOARD_WORKERS", "8")), thread_name_prefix="dashboard"
+)
+
+
+# Prebuilt with `flask --app app build-catalog-snapshot`; used while it matches courses.csv
+CATALOG_SNAPSHOT = os.environ.get("EDUSYNC_CATALOG_SNAPSHOT", "courses.snapshot")
+catalog = metrics.Instrumented(CourseCatalog.load('courses.csv', CATALOG_SNAPSHOT), "catalog")
+questions.bank.start_refresh()
+
+# Seconds between refits of the grade model on the full history
+grade_predictor = GradePredictor(catalog, refit_interval=float(os.environ.get("EDUSYNC_PREDICTOR_REFIT", "300")))
 
 def filter_courses(search_term, semester):
-    filtered = courses[
-        (
-            (courses['Discipline'].str.contains(search_term, case=False, na=False)) |
-            (courses['Course Title'].str.contains(search_term, case=False, na=False))
-        ) &
-        (courses['Semester'] == int(semester))
+    return catalog.search(search_term, semester)
+
+def cache_prompts():
+    return request.endpoint in PROMPT_CACHE_ROUTES
+
+def wants_job(data=None):
+    """Whether the caller asked for the work to run as a background job
+    (`"async": true` in the body or `?async=1`)."""
+    value = (data or {}).get('async', request.args.get('async'))
+    return value in (True, 1, '1', 'true')
+
+def enqueue(kind, username, semester, params):
+    job, created = jobs.queue.submit(kind, username, semester, params)
+    response = jsonify({"job_id": job["id"], "status": job["status"], "deduplicated": not created})
+    response.headers['Location'] = url_for('job_status', job_id=job["id"])
+    return response, 202
+
+def llm_error(api_response):
+    # Upstream failures are reported, never returned or stored as content
+    return jsonify({"error": api_response.get("response", "Error calling Groq API.")}), 502
+
+# Per-request profiling via ?profile=1 or an X-Profile: 1 header: adds a
+# Server-Timing header and logs the slowest functions. Off unless enabled.
+PROFILING = os.environ.get("EDUSYNC_PROFILING", "0") == "1"
+PROFILE_TOP = 25
+
+def profiling_requested():
+    return PROFILING and (request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1')
+
+@app.before_request
+def start_timing():
+    metrics.start_request(request.url_rule.rule if request.url_rule else "unmatched")
+    if profiling_requested():
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def add_timing(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(PROFILE_TOP)
+        app.logger.info("Profile for %s %s:\n%s", request.method, request.path, output.getvalue())
+        timings = metrics.current_request()
+        if timings is not None:
+            response.headers['Server-Timing'] = timings.server_timing()
+    timings = metrics.current_request()
+    if timings is not None and response.is_streamed:
+        # Time streams until the last chunk is sent, not until the view returns
+        method, status = request.method, response.status_code
+        response.call_on_close(lambda: metrics.finish_request(timings, method, status))
+        g.timing_deferred = True
+    g.status_code = response.status_code
+    return response
+
+@app.teardown_request
+def finish_timing(exc):
+    timings = metrics.current_request()
+    if timings is not None and not g.get('timing_deferred'):
+        metrics.finish_request(timings, request.method, 500 if exc is not None else g.get('status_code', 500))
+
+# JSON responses at least this many bytes are compressed for clients that
+# accept it (0 disables)
+COMPRESS_MIN_SIZE = int(os.environ.get("EDUSYNC_COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+@app.after_request
+def compress_response(response):
+    if (COMPRESS_MIN_SIZE <= 0 or response.status_code != 200 or response.is_streamed
+            or response.direct_passthrough or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    response.vary.add('Accept-Encoding')
+    if brotli is not None and request.accept_encodings['br']:
+        encoding, data = 'br', brotli.compress(data, quality=BROTLI_QUALITY)
+    elif request.accept_encodings['gzip']:
+        encoding, data = 'gzip', gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    else:
+        return response
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def version_etag(*parts):
+    """ETag for a response determined by the given data versions and
+    request parameters."""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:20]
+
+def with_validators(response, etag, last_modified=None, private=False):
+    """Mark a response with a weak ETag (it is the same whatever the
+    Content-Encoding) and have clients revalidate it on every use."""
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    if private:
+        response.cache_control.private = True
+    return response
+
+def not_modified(etag, last_modified=None, private=False):
+    """A 304 response if the request's If-None-Match or If-Modified-Since
+    already matches, otherwise None."""
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return with_validators(app.response_class(status=304), etag, last_modified, private)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    user_cache = storage.user_cache_stats()
+    breaker_state = llm_client.breaker.state
+    extra = [
+        metrics.gauge("edusync_user_cache", "User cache hits, misses and size.",
+                      [((key,), value) for key, value in sorted(user_cache.items())], ("stat",)),
+        metrics.gauge("edusync_prompt_cache", "LLM prompt cache hits, misses and size.",
+                      [((key,), value) for key, value in sorted(prompt_cache.stats().items())], ("stat",)),
+        metrics.gauge("edusync_chat_context", "Chat student summary hits, misses and students held.",
+                      [((key,), value) for key, value in sorted(chat_context.contexts.stats().items())], ("stat",)),
+        metrics.gauge("edusync_llm_circuit_state", "1 for the Groq circuit breaker's current state.",
+                      [((state,), int(state == breaker_state)) for state in ("closed", "half-open", "open")], ("state",)),
+        metrics.gauge("edusync_llm_consecutive_failures", "Consecutive failed Groq calls.",
+                      [((), llm_client.breaker.failures)]),
     ]
-    return filtered
+    return Response(metrics.render(extra), mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/register', methods=['POST'])
@@ -79,8 +226,7 @@ def register():
     if not all([username, password, name, age, discipline, current_semester]):
         return jsonify({"error": "All fields (username, password, name, age, discipline, current_semester) are required."}), 400
 
-    users = load_users()
-    if username in users:
+    if storage.get_user(username) is not None:
         return jsonify({"error": "Username already exists."}), 400
 
     user_data = {
@@ -92,7 +238,10 @@ def register():
         "current_semester": current_semester,
         "career_goal": career_goal
     }
-    save_user(user_data)
+    try:
+        storage.save_user(user_data)
+    except UserExistsError:
+        return jsonify({"error": "Username already exists."}), 400
     return jsonify({"message": "Registration successful.", "user": user_data})
 
 
@@ -105,8 +254,7 @@ def login():
     if not username or not password:
         return jsonify({"error": "Username and password are required."}), 400
 
-    users = load_users()
-    user = users.get(username)
+    user = storage.get_user(username)
     if not user or user.get("password") != password:
         return jsonify({"error": "Invalid credentials."}), 401
 
@@ -121,8 +269,7 @@ def add_history():
     if not username or not subject_data or not subject_data.get("semester"):
         return jsonify({"error": "Username, subject data and a valid semester are required."}), 400
 
-    users = load_users()
-    if username not in users:
+    if storage.get_user(username) is None:
         return jsonify({"error": "User not found."}), 404
 
     try:
@@ -137,46 +284,75 @@ def add_history():
         "attendance": subject_data.get("attendance"),
         "semester": semester_value  # saving the semester
     }
-    save_history(history_record)
+    storage.add_history(history_record)
     return jsonify({"message": "Subject history updated.", "record": history_record})
 
+def join_courses(rows):
+    """History rows with course_title and credits from the catalog, empty
+    strings in place of missing values."""
+    courses = catalog.course_info([row.get("subject_code") for row in rows])
+    records = []
+    for row, course in zip(rows, courses):
+        record = {str(key): "" if value is None else value for key, value in row.items()}
+        title, credits = course if course is not None else ("Unknown Course", "N/A")
+        record["course_title"] = title if title == title else ""
+        record["credits"] = credits if credits == credits else "N/A"  # NaN in courses.csv
+        records.append(record)
+    return records
+
+
+def history_ndjson(username, semester, cursor):
+    rows = storage.iter_history(username, semester, cursor)
+    while True:
+        batch = list(itertools.islice(rows, HISTORY_STREAM_BATCH))
+        if not batch:
+            return
+        positions = [position for position, _ in batch]
+        for position, record in zip(positions, join_courses([row for _, row in batch])):
+            record["cursor"] = position
+            yield json.dumps(record) + "\n"
+
+
 @app.route('/get_history', methods=['GET'])
 def get_history():
+    """A user's subject history. Without `cursor` or `limit` the whole list
+    is returned; with them, a page of at most HISTORY_PAGE_LIMIT records and
+    the `next_cursor` to fetch the one after. `semester` filters either way,
+    and `format=ndjson` (or Accept: application/x-ndjson) streams every
+    record after `cursor` as one JSON object per line."""
     username = request.args.get('username')
     if not username:
         return jsonify({"error": "Username is required."}), 400
-    if not os.path.exists("history.csv"):
-        return jsonify([])
-    
-    records = []
-    with open('history.csv', 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            if row["username"] == username:
-                matching = courses[courses['Course Code'] == row["subject_code"]]
-                if not matching.empty:
-                    course_info = matching.iloc[0]
-                    row["course_title"] = course_info["Course Title"]
-                    row["credits"] = course_info["Credits"]
-                else:
-                    row["course_title"] = "Unknown Course"
-                    row["credits"] = "N/A"
-                records.append(row)
-                
-    
-    cleaned_records = []
-    for record in records:
-        cleaned_record = {}
-        for key, value in record.items():
-            if value is None:
-                cleaned_record[str(key)] = ""
-            elif hasattr(value, "item"):  # e.g., numpy.int64
-                cleaned_record[str(key)] = value.item()
-            else:
-                cleaned_record[str(key)] = value
-        cleaned_records.append(cleaned_record)
-        
-    return jsonify(cleaned_records)
+    semester = request.args.get('semester')
+    cursor = request.args.get('cursor') or None
+    limit = request.args.get('limit')
+    try:
+        semester = int(semester) if semester else None
+        limit = min(int(limit), HISTORY_PAGE_LIMIT) if limit else None
+        if cursor is not None and int(cursor) < 0 or limit is not None and limit < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "semester, cursor and limit must be positive integers."}), 400
+
+    ndjson = request.args.get('format') == 'ndjson' or request.accept_mimetypes.best_match(
+        ['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+    if ndjson:
+        return Response(
+            stream_with_context(history_ndjson(username, semester, cursor)),
+            mimetype='application/x-ndjson'
+        )
+
+    # Unchanged history (and catalog) means an unchanged response
+    etag = version_etag(storage.history_version(username), catalog.version, username, semester, cursor, limit)
+    unchanged = not_modified(etag, private=True)
+    if unchanged is not None:
+        return unchanged
+    if cursor is None and limit is None:
+        response = jsonify(join_courses([row for _, row in storage.iter_history(username, semester)]))
+    else:
+        rows, next_cursor = storage.history_page(username, semester, cursor, limit or HISTORY_PAGE_LIMIT)
+        response = jsonify({"records": join_courses(rows), "next_cursor": next_cursor})
+    return with_validators(response, etag, private=True)
 
 
 @app.route('/update_profile', methods=['POST'])
@@ -186,62 +362,95 @@ def update_profile():
     if not username:
         return jsonify({"error": "Username is required."}), 400
 
-    users = load_users()
-    if username not in users:
+    user = storage.get_user(username)
+    if user is None:
         return jsonify({"error": "User not found."}), 404
 
     
     updated_user = {
         "username": username,
-        "password": data.get('password', users[username].get('password')),
-        "name": data.get('name', users[username].get('name')),
-        "age": data.get('age', users[username].get('age')),
-        "discipline": data.get('discipline', users[username].get('discipline')),
-        "current_semester": data.get('current_semester', users[username].get('current_semester')),
-        "career_goal": data.get('career_goal', users[username].get('career_goal', ""))  
+        "password": data.get('password', user.get('password')),
+        "name": data.get('name', user.get('name')),
+        "age": data.get('age', user.get('age')),
+        "discipline": data.get('discipline', user.get('discipline')),
+        "current_semester": data.get('current_semester', user.get('current_semester')),
+        "career_goal": data.get('career_goal', user.get('career_goal', ""))  
     }
-    users[username] = updated_user
-
-    
-    filename = 'users.csv'
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['username', 'password', 'name', 'age', 'discipline', 'current_semester', 'career_goal']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for user in users.values():
-            writer.writerow(user)
+    storage.update_user(updated_user)
 
     return jsonify({"message": "Profile updated.", "user": updated_user})
 
 
+def catalog_modified():
+    return datetime.fromtimestamp(catalog.modified, timezone.utc) if catalog.modified else None
+
+def described_courses(records, generate=True):
+    """Fill in course records for display. Also returns whether every
+    description was available: only then is the response marked cacheable,
+    since descriptions change only with the catalog, so a client holding it
+    for this catalog version is up to date."""
+    for record in records:
+        if "Hardness" not in record or not record["Hardness"]:
+            record["Hardness"] = "N/A"
+    return records, describe_courses(records, generate=generate)
+
 @app.route('/get_courses', methods=['GET'])
 def get_courses():
+    if 'q' in request.args:
+        return search_courses()
     search_term = request.args.get('discipline', '')
     semester = request.args.get('semester', '')
     if not search_term or not semester:
         return jsonify({"error": "Please provide both search term and semester"}), 400
-    filtered = filter_courses(search_term, semester)
-    if filtered.empty:
+
+    etag = version_etag(catalog.version, search_term, semester)
+    if catalog.version:
+        unchanged = not_modified(etag, catalog_modified())
+        if unchanged is not None:
+            return unchanged
+
+    result = filter_courses(search_term, semester)
+    if not result:
         return jsonify({"response": f"No courses found for '{search_term}' in semester {semester}."})
-    
-    result = filtered.to_dict(orient='records')
-    for record in result:
-        
-        if "Hardness" not in record or not record["Hardness"]:
-            record["Hardness"] = "N/A"
-        
-        
-        prompt = (
-            f"Generate a concise description (under 80 characters) for the course: "
-            f"{record['Course Code']} - {record['Course Title']}."
-        )
-        api_response = get_groq_response(prompt)
-        description = api_response.get("response", "").strip()
-        if len(description) > 80:
-            description = description[:80] + "..."
-        
-        record["Description"] = description if description else "Description not available."
-    return jsonify(result)
+
+    result, complete = described_courses(result)
+    response = jsonify(result)
+    if catalog.version and complete:
+        with_validators(response, etag, catalog_modified())
+    return response
+
+def search_courses():
+    """/get_courses?q=...: ranked search across the whole catalog by title
+    words, discipline, category and course code prefix, optionally filtered
+    by `semester`, `category` and `mandatory`, a `page` of `per_page`
+    results at a time."""
+    args = request.args
+    try:
+        semester = int(args['semester']) if args.get('semester') else None
+        page = max(1, int(args.get('page') or 1))
+        per_page = min(max(1, int(args.get('per_page') or COURSE_PAGE_SIZE)), MAX_COURSE_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "semester, page and per_page must be integers."}), 400
+    category = args.get('category') or None
+    mandatory = args.get('mandatory')
+    mandatory = None if not mandatory else mandatory.lower() in ('1', 'true', 'yes')
+
+    etag = version_etag(catalog.version, args['q'], semester, category, mandatory, page, per_page)
+    if catalog.version:
+        unchanged = not_modified(etag, catalog_modified())
+        if unchanged is not None:
+            return unchanged
+
+    total, results = catalog.query(args['q'], semester, category, mandatory, (page - 1) * per_page, per_page)
+    # Searches never wait on the LLM: missing descriptions are generated in
+    # the background and show up in later responses
+    results, complete = described_courses(results, generate=False)
+    if not complete:
+        descriptions.generate_later(results)
+    response = jsonify({"results": results, "total": total, "page": page, "per_page": per_page})
+    if catalog.version and complete:
+        with_validators(response, etag, catalog_modified())
+    return response
 
 @app.route('/recommend_courses', methods=['POST'])
 def recommend_courses():
@@ -250,14 +459,10 @@ def recommend_courses():
     if not username:
         return jsonify({"error": "Username is required."}), 400
 
-    users = load_users()
-    if username not in users:
+    user = storage.get_user(username)
+    if user is None:
         return jsonify({"error": "User not found."}), 404
 
-    
-    user = users[username]
-    discipline = user.get('discipline', '')
-    career_goal = user.get('career_goal', '')
     try:
         current_semester = int(user.get('current_semester', 0))
     except (ValueError, TypeError):
@@ -275,59 +480,74 @@ def recommend_courses():
         return jsonify({"error": "Recommendation is only available for semesters prior to the current semester."}), 400
 
     
-    filtered = filter_courses(discipline, input_semester)
-    if filtered.empty:
-        return jsonify({"response": f"No courses found for {discipline} in semester {input_semester}."})
-    
+    params = {
+        "username": username,
+        "semester": input_semester,
+        "predicted_grade": data.get('predicted_grade'),
+        "explain": data.get('explain', RECOMMENDATION_LLM_EXPLANATIONS),
+        "cache": cache_prompts(),
+    }
+    if wants_job(data):
+        return enqueue('recommend_courses', username, input_semester, params)
+    payload, status = recommendation(user, **params)
+    return jsonify(payload), status
+
+def recommendation(user, username, semester, predicted_grade=None, explain=False, cache=False):
+    """Pick and save a user's courses for a semester; returns (payload, status)."""
+    discipline = user.get('discipline', '')
+    career_goal = user.get('career_goal', '')
+    filtered = filter_courses(discipline, semester)
+    if not filtered:
+        return {"response": f"No courses found for {discipline} in semester {semester}."}, 200
+
+    selection = recommender.recommend(filtered, career_goal, predicted_grade)
+    selected = selection["mandatory"] + selection["optional"]
+
     course_list = []
-    courses_info = ""
-    for _, row in filtered.iterrows():
-        mandatory_label = "Mandatory" if float(row['Mandatory']) == 1.0 else "Optional"
-        detail = f"{row['Course Code']} - {row['Course Title']} (Credits: {row['Credits']}, {mandatory_label})"
-        course_list.append(detail)
-        courses_info += f"{detail}\n"
-    
-    
-    prompt = (
-        f"Given the following courses available in semester {input_semester} for {discipline}:\n"
-        f"{courses_info}\n"
-        f"The student is interested in a career in {career_goal}.\n"
-        "Recommend courses ensuring total credits are between 20 and 30.\n"
-        "Format your response exactly as follows:\n"
-        "MANDATORY COURSES: $\n"
-        "COURSE_CODE | COURSE_TITLE | REASON_FOR_RECOMMENDATION $\n"
-        "\n"
-        "OPTIONAL COURSES: $\n"
-        "COURSE_CODE | COURSE_TITLE | REASON_FOR_RECOMMENDATION $\n"
-        "\n"
-        "Rules:\n"
-        "1. Include all mandatory courses first\n"
-        "2. Each course must be on a new line\n"
-        "3. Use | as separator\n"
-        "4. End each line with $\n"
-        "5. Keep reasons brief and relevant\n"
-        "6. No additional text or symbols\n"
-        "7. Maintain exact section headers as shown\n"
-    )
-    
-    predicted_grade = data.get('predicted_grade')
-    if predicted_grade is not None:
-        prompt += f" The student's predicted grade is {predicted_grade}%."
-    
-    groq_response = get_groq_response(prompt)
-    
-    
+    for entry in selected:
+        row = entry["course"]
+        mandatory_label = "Mandatory" if recommender.is_mandatory(row) else "Optional"
+        course_list.append(f"{row['Course Code']} - {row['Course Title']} (Credits: {row['Credits']}, {mandatory_label})")
+
+    explanation = recommender.format_recommendation(selection)
+
+    # The selection is computed locally; the LLM is only asked to reword the
+    # reasons, and its text is dropped if the call fails.
+    if explain:
+        prompt = (
+            f"A student of {discipline} in semester {semester} is interested in a career in {career_goal}.\n"
+            "These courses have been selected for them:\n"
+            f"{explanation}\n\n"
+            "Rewrite each REASON_FOR_RECOMMENDATION to be brief and specific to the student's career goal.\n"
+            "Keep everything else exactly as it is: the same courses, section headers, | separators and $ line endings.\n"
+            "No additional text or symbols."
+        )
+        groq_response = get_groq_response(prompt, cache=cache)
+        if not groq_response.get("error"):
+            explanation = groq_response.get("response", explanation)
+
     recommendation_record = {
         "username": username,
-        "semester": input_semester,
+        "semester": semester,
         "recommended_courses": "; ".join(course_list)
     }
-    save_recommendation(recommendation_record)
-    
-    return jsonify({
+    storage.save_recommendation(recommendation_record)
+
+    return {
         "courses": course_list,
-        "recommendation_explanation": groq_response.get("response", "No recommendation received.")
-    })
+        "total_credits": selection["total_credits"],
+        "recommendation_explanation": explanation
+    }, 200
+
+def planned_courses(user, semester):
+    """Course codes a user is expected to take in a semester: their saved
+    recommendation, or a fresh local one if there is none."""
+    recommended = storage.get_recommendation(user['username'], semester)
+    if recommended:
+        return [item.split(' - ', 1)[0].strip() for item in recommended.split('; ') if item.strip()]
+    courses = filter_courses(user.get('discipline', ''), semester)
+    selection = recommender.recommend(courses, user.get('career_goal', ''))
+    return [entry["course"]['Course Code'] for entry in selection["mandatory"] + selection["optional"]]
 
 @app.route('/predict_grades', methods=['POST'])
 def predict_grades():
@@ -345,63 +565,74 @@ def predict_grades():
         return jsonify({"error": "Invalid semester input."}), 400
 
     try:
-        target_grade = float(target_grade) if target_grade is not None else None
+        target_grade = float(target_grade) if target_grade not in (None, "") else None
     except (ValueError, TypeError):
         target_grade = None
 
-    
-    history_records = []
-    if os.path.exists("history.csv"):
-        with open('history.csv', 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row["username"] == username:
-                    history_records.append(row)
-    
-    history_summary = ""
-    if history_records:
-        history_summary += "Past Academic Records:\n"
-        for rec in history_records:
-            history_summary += f"{rec['subject_code']} - Grade: {rec['grade']} (Semester: {rec['semester']})\n"
-    else:
-        history_summary += "No past academic records available.\n"
-    
-    
-    recommended_courses = ""
-    if os.path.exists("recommendations.csv"):
-        with open('recommendations.csv', 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                try:
-                    rec_sem = int(row["semester"])
-                except (ValueError, TypeError):
-                    continue
-                if row["username"] == username and rec_sem == selected_semester:
-                    recommended_courses = row["recommended_courses"]
-                    break
-    if not recommended_courses:
-        recommended_courses = "No recommended courses available for this semester."
+    try:
+        attendance = float(data['attendance']) if data.get('attendance') not in (None, "") else None
+    except (ValueError, TypeError):
+        attendance = None
 
-    
-    prompt = (
-        f"Past Academic Records:\n{history_summary}\n"
-        f"Recommended Courses for Semester {selected_semester}:\n{recommended_courses}\n"
-        f"{'Target Grade: ' + str(target_grade) + '%\n' if target_grade is not None else ''}"
-        "\n"
-        "+-------------+------------------+------------------+\n"
-        "| Course Code | Predicted Grade | Required Grade   |\n"
-        "+-------------+------------------+------------------+\n"
-        "Return a table in the exact format shown above, with:\n"
-        "1. Each row following the pattern: |{code:^11}|{predicted:^16}|{required:^16}|\n"
-        "2. Only include numeric values for grades (0-100)\n"
-        "3. End the table with: +-------------+------------------+------------------+\n"
-        "4. Align all values in the center of their columns\n"
-        "5. Include % symbol after each grade value\n"
-        "Example row: | CS101      |      85%        |      90%        |\n"
+    user = storage.get_user(username)
+    if user is None:
+        return jsonify({"error": "User not found."}), 404
+
+    params = {
+        "username": username,
+        "semester": selected_semester,
+        "target_grade": target_grade,
+        "attendance": attendance,
+    }
+    if wants_job(data):
+        return enqueue('predict_grades', username, selected_semester, params)
+    payload, status = grade_prediction(user, **params)
+    return jsonify(payload), status
+
+def grade_prediction(user, username, semester, target_grade=None, attendance=None):
+    """Predicted grades for a user's planned courses; returns (payload, status)."""
+    course_codes = planned_courses(user, semester)
+    if not course_codes:
+        return {"error": f"No courses found for semester {semester}."}, 404
+
+    grade_predictor.refresh(storage.all_history)
+    predictions = grade_predictor.predict_student(
+        username, storage.get_history(username), course_codes, target_grade, attendance
     )
-    
-    groq_response = get_groq_response(prompt)
-    return jsonify({"predicted_grade_details": groq_response.get("response", "No prediction received.")})
+    for prediction in predictions:
+        course = catalog.get(prediction["course_code"])
+        prediction["course_title"] = course['Course Title'] if course else None
+
+    return {
+        "predictions": predictions,
+        "predicted_grade_details": format_predictions(predictions)
+    }, 200
+
+SKILL_KEYS = ["Analytical Thinking", "Communication Skills", "Research Skills", "Teamwork", "Technical Writing"]
+
+def skill_chart_profile(user):
+    return json.dumps([user.get('discipline'), user.get('career_goal'), str(user.get('current_semester'))])
+
+def cached_skill_chart(username, user):
+    """The saved chart, if it was generated for the user's current
+    discipline, career goal and semester; otherwise None."""
+    cached = storage.get_skill_chart(username)
+    if cached and cached.get('profile') == skill_chart_profile(user):
+        try:
+            return json.loads(cached['skills'])
+        except ValueError:
+            pass
+    return None
+
+def parse_skills(api_response, error_message):
+    raw = (api_response or {}).get("response", "")
+    try:
+        skills = json.loads(raw.strip() or "{}")
+    except Exception:
+        return {"error": error_message, "raw_response": raw}
+    if not isinstance(skills, dict):
+        return {"error": error_message, "raw_response": raw}
+    return skills
 
 @app.route('/generate_skill_chart', methods=['GET'])
 def generate_skill_chart():
@@ -409,78 +640,62 @@ def generate_skill_chart():
     if not username:
         return jsonify({"error": "Username is required."}), 400
 
-    users = load_users()
-    if username not in users:
+    user = storage.get_user(username)
+    if user is None:
         return jsonify({"error": "User not found."}), 404
 
-    user = users[username]
-    user_data = (
-        f"Username: {user.get('username')}, "
-        f"Name: {user.get('name')}, "
-        f"Age: {user.get('age')}, "
-        f"Discipline: {user.get('discipline')}, "
-        f"Current Semester: {user.get('current_semester')}, "
-        f"Career Goal: {user.get('career_goal')}"
-    )
-
-    # Prompt for current skills assessment
+    params = {"username": username, "refresh": bool(request.args.get('refresh')), "cache": cache_prompts()}
+    if wants_job():
+        return enqueue('generate_skill_chart', username, user.get('current_semester'), params)
+    payload, status = skill_chart(user, **params)
+    return jsonify(payload), status
+
+def skill_chart(user, username, refresh=False, cache=False):
+    """The user's current and required skills, from the saved chart unless
+    their profile changed or refresh is set; returns (payload, status)."""
+    if not refresh:
+        cached = cached_skill_chart(username, user)
+        if cached is not None:
+            return cached, 200
+    profile = skill_chart_profile(user)
+
+    # Both prompts use the fixed SKILL_KEYS, so they can be sent together
     current_skills_prompt = (
         f"Based on the student's career goal: {user.get('career_goal')} and discipline: {user.get('discipline')},\n"
-        "generate ONLY a 5 skill JSON object with the same keys as provided in the current skill assessment after strict evaluation.\n"
-        "For each skill, assign the required minimum level (0-100) as a number. Do not include any explanation or additional characters.\n"
-        "Example (if current keys are \"Analytical Thinking\", \"Communication Skills\", \"Research Skills\", \"Teamwork\", \"Technical Writing\"):\n"
-        "{\"Analytical Thinking\": 12, \"Communication Skills\": 04, \"Research Skills\": 19, \"Teamwork\": 23, \"Technical Writing\": 20}"
+        f"and that they are currently in semester {user.get('current_semester')},\n"
+        f"Using exactly these keys: {json.dumps(SKILL_KEYS)}\n"
+        "generate ONLY a 5 skill JSON object with the student's current level in each skill after strict evaluation.\n"
+        "For each skill, assign the level (0-100) as a number. Do not include any explanation or additional characters.\n"
+        "Example: {\"Analytical Thinking\": 12, \"Communication Skills\": 04, \"Research Skills\": 19, \"Teamwork\": 23, \"Technical Writing\": 20}"
     )
-
-    current_response = get_groq_response(current_skills_prompt)
-    try:
-        current_skills = json.loads(current_response.get("response", "{}").strip())
-    except Exception as e:
-        current_skills = {"error": "Failed to parse current skills JSON", "raw_response": current_response.get("response", "")}
-
-    # Extract the keys from current skills to enforce same ones in required skills
-    current_keys = list(current_skills.keys()) if isinstance(current_skills, dict) and 'error' not in current_skills else []
-
-    # Prompt for required skills assessment using the same keys
     required_skills_prompt = (
         f"Based on the student's career goal: {user.get('career_goal')} and discipline: {user.get('discipline')},\n"
-        f"Using exactly these keys: {json.dumps(current_keys)}\n"
+        f"Using exactly these keys: {json.dumps(SKILL_KEYS)}\n"
         "generate ONLY a 5 skill JSON object for required skills to reach his goal  where each key is identical and assign the required minimum level (0-100) as a number. Do not include any explanation or additional characters.\n"
         "Example: {\"Analytical Thinking\": 85, \"Communication Skills\": 90, \"Research Skills\": 75, \"Teamwork\": 95, \"Technical Writing\": 80}"
     )
 
-    required_response = get_groq_response(required_skills_prompt)
-    try:
-        required_skills = json.loads(required_response.get("response", "{}").strip())
-    except Exception as e:
-        required_skills = {"error": "Failed to parse required skills JSON", "raw_response": required_response.get("response", "")}
+    # A refresh asks for a new answer, so it must not be served the cached one
+    current_response, required_response = get_groq_responses(
+        [current_skills_prompt, required_skills_prompt], cache=cache and not refresh
+    )
+    # Upstream failures and unreadable answers fail the request (and its
+    # job) rather than being drawn or saved as a chart
+    for api_response in (current_response, required_response):
+        if api_response is None or api_response.get("error"):
+            return {"error": (api_response or {}).get("response") or "Error calling Groq API."}, 502
+    current_skills = parse_skills(current_response, "Failed to parse current skills JSON")
+    required_skills = parse_skills(required_response, "Failed to parse required skills JSON")
+    for skills in (current_skills, required_skills):
+        if 'error' in skills:
+            return skills, 502
 
     result = {
         "current": current_skills,
         "required": required_skills
     }
-
-    # Save the dual skill chart data to CSV
-    filename = 'skillcharts.csv'
-    file_exists = os.path.exists(filename)
-    rows = []
-    if file_exists:
-        with open(filename, mode='r', newline='', encoding='utf-8') as readfile:
-            rows = list(csv.DictReader(readfile))
-        rows = [row for row in rows if row['username'] != username]
-
-    rows.append({
-        "username": username,
-        "skills": json.dumps(result)
-    })
-
-    with open(filename, mode='w', newline='', encoding='utf-8') as writefile:
-        fieldnames = ['username', 'skills']
-        writer = csv.DictWriter(writefile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
-
-    return jsonify(result)
+    storage.save_skill_chart(username, json.dumps(result), profile)
+    return result, 200
 
 @app.route('/psych_eval_question', methods=['POST'])
 def get_psych_eval_question():
@@ -492,33 +707,30 @@ def get_psych_eval_question():
         return jsonify({"error": "Username and current criterion are required."}), 400
 
     
-    user_details = {}
-    if os.path.exists('users.csv'):
-        with open('users.csv', 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row['username'] == username:
-                    user_details = row
-                    break
-
+    user_details = storage.get_user(username)
     if not user_details:
         return jsonify({"error": "User not found."}), 404
 
-    
-    prompt = (
-        f"Generate a question to evaluate the user's {current_criterion}. "
-        f"The user is {user_details.get('age', 'unknown')} years old, studying {user_details.get('discipline', 'unknown')}, "
-        f"and is currently in semester {user_details.get('current_semester', 'unknown')}. "
-        f"The question should be short and specific to their background and relevant to {current_criterion} and musn't be too much focused on their discipline as this is a question for psychological evaluation. "
-        f"Only return the question text without any additional explanation or context."
+    ai_response = questions.get_question(
+        current_criterion, user_details.get('discipline'), user_details.get('current_semester')
     )
-
-    
-    ai_response = get_groq_response(prompt)
+    if ai_response.get("error"):
+        return llm_error(ai_response)
     question = ai_response.get("response", "No question available.")
 
     return jsonify({"question": question})
 
+def psych_rank_prompt(criterion, response):
+    return (
+        f"The user responded to the question about {criterion} with: '{response}'. "
+        "Rank the user's ability in this criterion on a scale of 1 to 100. "
+        "Only return the numeric score as a single number without any additional text or explanation."
+    )
+
+def parse_score(raw):
+    match = re.search(r"\d+", str(raw))
+    return min(100, int(match.group())) if match else 0
+
 @app.route('/psych_eval_rank', methods=['POST'])
 def rank_psych_eval_response():
     data = request.get_json()
@@ -529,94 +741,168 @@ def rank_psych_eval_response():
     if not username or not criterion or not response:
         return jsonify({"error": "Username, criterion, and response are required."}), 400
 
+    ai_response = get_groq_response(psych_rank_prompt(criterion, response))
+    if ai_response.get("error"):
+        return llm_error(ai_response)
+    score = parse_score(ai_response.get("response", "0").strip())
+
+    storage.set_psych_scores(username, {psych_column(criterion): score})
+
     
+    return jsonify({"message": "Response recorded successfully."})
+
+@app.route('/psych_eval_rank_batch', methods=['POST'])
+def rank_psych_eval_responses():
+    """Score every answered criterion with one LLM call and save them in a
+    single write. Criteria the combined answer misses are scored
+    concurrently, one prompt each."""
+    data = request.get_json()
+    username = data.get('username')
+    responses = data.get('responses')
+
+    if not username or not isinstance(responses, dict) or not responses:
+        return jsonify({"error": "Username and responses are required."}), 400
+
+    unknown = [criterion for criterion in responses if criterion not in criteria]
+    if unknown:
+        return jsonify({"error": f"Unknown criteria: {', '.join(unknown)}."}), 400
+    responses = {criterion: str(answer).strip() for criterion, answer in responses.items() if str(answer).strip()}
+    if not responses:
+        return jsonify({"error": "Username and responses are required."}), 400
+
+    answers = "\n".join(f"- {criterion}: '{answer}'" for criterion, answer in responses.items())
     prompt = (
-        f"The user responded to the question about {criterion} with: '{response}'. "
-        "Rank the user's ability in this criterion on a scale of 1 to 100. "
-        "Only return the numeric score as a single number without any additional text or explanation."
+        "The user answered one question about each of these psychological criteria:\n"
+        f"{answers}\n\n"
+        "Rank the user's ability in each criterion on a scale of 1 to 100 based on their answer. "
+        "Return only a JSON object mapping each criterion name exactly as written above to its integer score, "
+        "without any additional text or explanation."
     )
     ai_response = get_groq_response(prompt)
-    raw_score = ai_response.get("response", "0").strip()
+    if ai_response.get("error"):
+        return llm_error(ai_response)
 
-    
+    scores = {}
+    raw = ai_response.get("response", "")
     try:
-        score = int(raw_score)  
+        ranked = json.loads(raw[raw.index("{"):raw.rindex("}") + 1])
     except ValueError:
-        score = 0  
+        ranked = {}
+    if isinstance(ranked, dict):
+        for criterion in responses:
+            if criterion in ranked:
+                scores[criterion] = parse_score(ranked[criterion])
+
+    missing = [criterion for criterion in responses if criterion not in scores]
+    if missing:
+        results = get_groq_responses([psych_rank_prompt(c, responses[c]) for c in missing])
+        failed = [c for c, result in zip(missing, results) if not result or result.get("error")]
+        if failed:
+            return jsonify({"error": f"Could not score: {', '.join(failed)}."}), 502
+        for criterion, result in zip(missing, results):
+            scores[criterion] = parse_score(result.get("response", "0"))
+
+    storage.set_psych_scores(username, {psych_column(c): score for c, score in scores.items()})
+
+    return jsonify({"message": "Responses recorded successfully.", "scores": scores})
+
+
+
+def saved_psych_scores(username):
+    row = storage.get_psych_eval(username) or {}
+    scores = {}
+    for criterion in criteria:
+        try:
+            scores[criterion] = int(float(row.get(psych_column(criterion))))
+        except (TypeError, ValueError):
+            continue
+    return scores
+
+def semester_courses(user, semester):
+    """The user's courses for a semester with any cached descriptions; never
+    waits on the LLM."""
+    if semester is None:
+        return []
+    records = filter_courses(user.get('discipline', ''), semester)
+    describe_courses(records, generate=False)
+    return records
+
+def gather(**calls):
+    """Run independent calls side by side in the current request's context;
+    returns {name: result}."""
+    futures = {
+        name: dashboard_executor.submit(contextvars.copy_context().run, call)
+        for name, call in calls.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
 
-    
-    filename = 'psych_eval.csv'
-    file_exists = os.path.exists(filename)
+@app.route('/dashboard_state', methods=['GET'])
+def dashboard_state():
+    """What the dashboard needs after login, in one response: the profile,
+    subject history, the current semester's courses, the saved skill chart
+    (null until one is generated) and psych evaluation scores."""
+    username = request.args.get('username')
+    if not username:
+        return jsonify({"error": "Username is required."}), 400
 
-    
-    existing_data = {}
-    if file_exists:
-        with open(filename, mode='r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                existing_data[row['username']] = row
+    user = storage.get_user(username)
+    if user is None:
+        return jsonify({"error": "User not found."}), 404
+    user.pop('password', None)
+    try:
+        semester = int(user.get('current_semester'))
+    except (TypeError, ValueError):
+        semester = None
+
+    state = gather(
+        history=lambda: join_courses(storage.get_history(username)),
+        courses=lambda: semester_courses(user, semester),
+        skill_chart=lambda: cached_skill_chart(username, user),
+        psych_scores=lambda: saved_psych_scores(username),
+    )
+    return jsonify({"user": user, "semester": semester, **state})
 
-    
-    if username not in existing_data:
-        existing_data[username] = {"username": username}
-    existing_data[username][criterion.lower().replace(" ", "_")] = score
 
-    
-    with open(filename, mode='w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['username'] + [c.lower().replace(" ", "_") for c in criteria]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for user_data in existing_data.values():
-            writer.writerow(user_data)
+CHAT_RULES = (
+    "You are an AI assistant created by EDUSYNC by the students of Sahrdaya College of Engineering and Technology "
+    "for helping a student. Tailor answers to their academic level, discipline and career goal, and consider their "
+    "psychological strengths and weaknesses; don't hesitate to point out the negatives. Be encouraging and "
+    "supportive. Keep answers short and precise, in plain text without formatting symbols."
+)
 
-    
-    return jsonify({"message": "Response recorded successfully."})
+def chat_context_version(user, username):
+    """Changes whenever anything in the student's chat summary may have."""
+    profile = [str(user.get(field, '')) for field in ('age', 'discipline', 'current_semester', 'career_goal')]
+    return "|".join(profile + [storage.history_version(username), storage.psych_version(username)])
 
+def chat_system_prompt(user, username):
+    summary = chat_context.contexts.summary(
+        username, chat_context_version(user, username),
+        lambda: chat_context.summarize(user, saved_psych_scores(username), join_courses(storage.get_history(username)))
+    )
+    return f"{CHAT_RULES}\n\nAbout the student:\n{summary}"
 
-criteria = [
-    "Analytical Thinking",
-    "Creativity",
-    "Logical Reasoning",
-    "Problem-Solving",
-    "Decision-Making",
-    "Emotional Resilience",
-    "Motivation",
-    "Curiosity",
-    "Attention to Detail",
-    "Communication Skills",
-    "Collaboration",
-    "Risk-Taking",
-    "Self-Discipline",
-    "Learning Style Preference",
-    "Adaptability"
-]
+def sse_event(data, event=None):
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
 
-def get_groq_response(user_input, language="english"):
-    groq_api_key = ""#paste api key here
-    if not groq_api_key:
-        return {"response": "API key not configured."}
-    
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {groq_api_key}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "model": "gemma2-9b-it",
-        "messages": [
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": user_input}
-        ]
-    }
-    response = requests.post(url, headers=headers, json=data)
-    if response.ok:
-        json_response = response.json()
-        if "choices" in json_response and len(json_response["choices"]) > 0:
-            return {"response": json_response["choices"][0]["message"]["content"]}
-        else:
-            return {"response": "No response received from Groq API."}
-    else:
-        return {"response": f"Error calling Groq API: {response.status_code}, {response.text}"}
+def stream_chat_response(prompt, cache=False, system=None, history=(), on_reply=None):
+    """SSE events for the reply to prompt; on_reply gets the whole reply
+    once it has streamed in full."""
+    parts = []
+    try:
+        for token in stream_groq_response(prompt, cache=cache, system=system, history=history):
+            parts.append(token)
+            yield sse_event({"token": token})
+    except LLMError as e:
+        yield sse_event({"error": str(e)}, event="error")
+        return
+    except Exception as e:
+        yield sse_event({"error": f"Error calling Groq API: {e}"}, event="error")
+        return
+    if on_reply is not None and parts:
+        on_reply("".join(parts))
+    yield sse_event({}, event="done")
 
 @app.route('/chat_with_ai', methods=['POST'])
 def chat_with_ai():
@@ -627,60 +913,107 @@ def chat_with_ai():
     if not username:
         return jsonify({"error": "Username is required"}), 400
 
-    
-    users = load_users()
-    if username not in users:
+    user = storage.get_user(username)
+    if user is None:
         return jsonify({"error": "User not found"}), 404
-    
-    user = users[username]
-
-    
-    psych_eval_data = {}
-    if os.path.exists('psych_eval.csv'):
-        with open('psych_eval.csv', mode='r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row['username'] == username:
-                    psych_eval_data = row
-                    break
-
-    
-    history_data = []
-    if os.path.exists('history.csv'):
-        with open('history.csv', mode='r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if row['username'] == username:
-                    history_data.append(row)
 
-    
-    prompt = (
-        f"You are an AI assistant created by EDUSYNC by the students of Sahrdaya College of Engineering and Technology for helping a student. Here's the context about the student:\n\n"
-        f"Personal Information:\n"
-        f"- Age: {user.get('age')}\n"
-        f"- Discipline: {user.get('discipline')}\n"
-        f"- Current Semester: {user.get('current_semester')}\n"
-        f"- Career Goal: {user.get('career_goal')}\n\n"
-        
-        f"Psychological Profile:(out of 100)\n"
-        f"{json.dumps(psych_eval_data, indent=2)}\n\n"
-        
-        f"Consider the student's background, goals, and psychological profile while answering.\n"
-        f"Provide answers that are:\n"
-        f"1. Tailored to their academic level and discipline\n"
-        f"2. Aligned with their career goals\n"
-        f"3. Considerate of their psychological strengths and areas for improvement and also their negatives\n"
-        f"4. Encouraging and supportive\n"
-        f"5. Dont put any text fromatters and other unwanted symbols keep your answers short and precise\n"
-        f"5. Dont hestitate to talk about the negatives of the user\n"
-        
-        f"Student's Question: {user_message}\n\n"
-        f"Provide a helpful, personalized response while follwing all the rules:"
-    )
+    # The student summary goes in the system prompt and earlier turns of
+    # the conversation as messages; `"reset": true` starts a new one.
+    if data.get('reset'):
+        chat_context.memory.forget(username)
+    system = chat_system_prompt(user, username)
+    history = chat_context.memory.messages(username)
+
+    def remember(reply):
+        chat_context.memory.remember(username, user_message, reply)
+
+    # Server-Sent Events: one "data: {"token": ...}" event per chunk as
+    # Groq produces it, then an "event: done".
+    if data.get('stream') or request.accept_mimetypes.best == 'text/event-stream':
+        return Response(
+            stream_with_context(stream_chat_response(user_message, cache_prompts(), system, history, remember)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
 
-    groq_response = get_groq_response(prompt)
+    groq_response = get_groq_response(user_message, cache=cache_prompts(), system=system, history=history)
+    if groq_response.get("error"):
+        return llm_error(groq_response)
+    remember(groq_response["response"])
     return jsonify(groq_response)
 
+def job_handler(run):
+    """A job handler that loads the user, then calls run(user, **params)."""
+    def handle(params):
+        user = storage.get_user(params["username"])
+        if user is None:
+            return {"error": "User not found."}, 404
+        return run(user, **params)
+    return handle
+
+jobs.queue.register('recommend_courses', job_handler(recommendation))
+jobs.queue.register('predict_grades', job_handler(grade_prediction))
+jobs.queue.register('generate_skill_chart', job_handler(skill_chart))
+jobs.queue.recover()
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """A background job's status; once done it carries the route's usual
+    response as `result`, or `error` if it failed."""
+    job = jobs.queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(job)
+
+@app.cli.command('warm-descriptions')
+def warm_descriptions():
+    """Pre-generate the course description cache for every course."""
+    descriptions.warm(catalog.records)
+
+@app.cli.command('warm-questions')
+def warm_questions():
+    """Pre-generate psych evaluation questions for every criterion,
+    discipline and semester band."""
+    disciplines = set(catalog.distinct('Discipline'))
+    disciplines.update(user.get('discipline') for user in storage.load_users().values() if user.get('discipline'))
+    questions.warm(criteria, sorted(disciplines), catalog.by_semester)
+
+@app.cli.command('build-catalog-snapshot')
+def build_catalog_snapshot():
+    """Write courses.csv to a snapshot that workers memory-map at startup."""
+    CourseCatalog.from_csv('courses.csv').save_snapshot(CATALOG_SNAPSHOT, source='courses.csv')
+    click.echo(f"Wrote {CATALOG_SNAPSHOT}")
+
+@app.cli.command('migrate-storage')
+@click.option('--force', is_flag=True, help='Re-import even if the database was already migrated.')
+def migrate_storage(force):
+    """Copy the CSV data files into the SQLite database."""
+    counts = migrate_csv_to_sqlite(CsvStorage(DATA_DIR, criteria), SqliteStorage(DB_PATH), force=force)
+    if counts is None:
+        click.echo(f"{DB_PATH} was already migrated; use --force to re-import.")
+        return
+    for table, count in counts.items():
+        click.echo(f"{table}: {count} rows")
+
+@app.cli.command('predict-grades')
+@click.option('--semester', type=int, help="Semester to predict (default: each student's current semester).")
+@click.option('--output', type=click.Path(dir_okay=False), default='grade_predictions.csv', show_default=True)
+def predict_cohort(semester, output):
+    """Precompute grade predictions for every student in one pass."""
+    history = storage.all_history()
+    grade_predictor.fit(history)
+    plan = []
+    for username, user in storage.load_users().items():
+        try:
+            user_semester = semester or int(user.get('current_semester') or 0)
+        except ValueError:
+            continue
+        if user_semester:
+            plan.extend((username, code) for code in planned_courses(user, user_semester))
+    predictions = grade_predictor.predict(history, plan)
+    predictions.drop(columns=['required_grade']).to_csv(output, index=False)
+    click.echo(f"{len(predictions)} predictions for {predictions['username'].nunique()} students written to {output}")
+
 @app.route('/')
 def index():
     return render_template('dashboard.html')
@@ -0,0 +1,142 @@
+"""Generate synthetic EDUSYNC data files for benchmarking.
+
+Writes users.csv, history.csv, recommendations.csv, psych_eval.csv and
+skillcharts.csv (plus a copy of courses.csv) into a directory. Course codes
+and disciplines come from the real catalog so joins behave as in
+production. Every user's password is "bench".
+
+    python benchmarks/datagen.py --scale 100k --out /tmp/edusync-100k
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog import CourseCatalog  # noqa: E402
+from recommender import is_mandatory  # noqa: E402
+from storage import HISTORY_FIELDS, RECOMMENDATION_FIELDS, SKILLCHART_FIELDS, USER_FIELDS, psych_column  # noqa: E402
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+PASSWORD = "bench"
+CAREER_GOALS = ["Data Scientist", "Professor", "Research Scientist", "Software Engineer", "Journalist", "Civil Servant"]
+CRITERIA = [
+    "Analytical Thinking", "Creativity", "Logical Reasoning", "Problem-Solving", "Decision-Making",
+    "Emotional Resilience", "Motivation", "Curiosity", "Attention to Detail", "Communication Skills",
+    "Collaboration", "Risk-Taking", "Self-Discipline", "Learning Style Preference", "Adaptability"
+]
+SKILLS = ["Analytical Thinking", "Communication Skills", "Research Skills", "Teamwork", "Technical Writing"]
+
+
+def parse_scale(value):
+    value = value.lower()
+    return SCALES[value] if value in SCALES else int(value)
+
+
+def username(i):
+    return f"bench{i:07d}"
+
+
+def load_catalog(path):
+    """{discipline: {semester: [(code, title, credits, mandatory)]}} for the
+    disciplines that have courses in every semester from 1 to 4."""
+    catalog = {}
+    for record in CourseCatalog.from_csv(path).records:
+        semester = record["Semester"]
+        if not str(record["Discipline"]).startswith("FYUGP") or semester != semester:
+            continue
+        credits = record["Credits"]
+        catalog.setdefault(record["Discipline"], {}).setdefault(int(semester), []).append((
+            record["Course Code"], record["Course Title"],
+            int(credits) if credits == credits else 0, is_mandatory(record)
+        ))
+    return {d: s for d, s in catalog.items() if all(sem in s for sem in range(1, 5))}
+
+
+def generate(out, users, history, seed=42, courses=os.path.join(ROOT, "courses.csv"), log=print):
+    rng = random.Random(seed)
+    os.makedirs(out, exist_ok=True)
+    shutil.copyfile(courses, os.path.join(out, "courses.csv"))
+    catalog = load_catalog(courses)
+    disciplines = sorted(catalog)
+    profiles = []
+
+    with open(os.path.join(out, "users.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=USER_FIELDS)
+        writer.writeheader()
+        for i in range(users):
+            discipline = rng.choice(disciplines)
+            semester = rng.randint(2, 5)
+            profiles.append((discipline, semester))
+            writer.writerow({
+                "username": username(i), "password": PASSWORD, "name": f"Bench User {i}",
+                "age": rng.randint(18, 24), "discipline": discipline,
+                "current_semester": semester, "career_goal": rng.choice(CAREER_GOALS),
+            })
+    log(f"users.csv: {users} rows")
+
+    with open(os.path.join(out, "history.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=HISTORY_FIELDS)
+        writer.writeheader()
+        for n in range(history):
+            i = n % users
+            discipline, current = profiles[i]
+            semester = rng.randint(1, max(1, min(4, current - 1)))
+            code = rng.choice(catalog[discipline][semester])[0]
+            writer.writerow({
+                "username": username(i), "subject_code": code,
+                "grade": round(rng.uniform(5, 10), 1), "attendance": rng.randint(60, 100), "semester": semester,
+            })
+    log(f"history.csv: {history} rows")
+
+    with open(os.path.join(out, "recommendations.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RECOMMENDATION_FIELDS)
+        writer.writeheader()
+        for i in range(0, users, 2):
+            discipline, semester = profiles[i]
+            semester = min(semester, 4)
+            courses = catalog[discipline][semester][:8]
+            writer.writerow({
+                "username": username(i), "semester": semester,
+                "recommended_courses": "; ".join(
+                    f"{code} - {title} (Credits: {credits}, {'Mandatory' if mandatory else 'Optional'})"
+                    for code, title, credits, mandatory in courses
+                ),
+            })
+
+    psych_columns = [psych_column(c) for c in CRITERIA]
+    with open(os.path.join(out, "psych_eval.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["username"] + psych_columns)
+        writer.writeheader()
+        for i in range(0, users, 2):
+            writer.writerow({"username": username(i), **{c: rng.randint(20, 95) for c in psych_columns}})
+
+    with open(os.path.join(out, "skillcharts.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SKILLCHART_FIELDS)
+        writer.writeheader()
+        for i in range(0, users, 4):
+            skills = {side: {s: rng.randint(40, 95) for s in SKILLS} for side in ("current", "required")}
+            writer.writerow({"username": username(i), "skills": json.dumps(skills), "profile": ""})
+    log(f"recommendations.csv, psych_eval.csv, skillcharts.csv written to {out}")
+    return profiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic EDUSYNC data files.")
+    parser.add_argument("--scale", default="1k", help="rows in users.csv and history.csv: 1k, 100k, 1m or a number")
+    parser.add_argument("--users", type=int, help="override the number of users")
+    parser.add_argument("--history", type=int, help="override the number of history rows")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True, help="directory to write the files to")
+    args = parser.parse_args()
+    rows = parse_scale(args.scale)
+    generate(args.out, args.users or rows, args.history or rows, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
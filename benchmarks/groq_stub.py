@@ -0,0 +1,122 @@
+"""Local stand-in for the Groq chat-completions endpoint.
+
+Answers every prompt after a configurable delay with a canned reply shaped
+like what the app expects for that prompt (skill JSON, a score, a list of
+questions, ...), reports token usage, and streams when asked to.
+
+    python benchmarks/groq_stub.py --port 8765 --latency 0.5 --jitter 0.1
+
+Point the app at it with GROQ_API_URL=http://127.0.0.1:8765/ and any
+GROQ_API_KEY.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SKILLS = ["Analytical Thinking", "Communication Skills", "Research Skills", "Teamwork", "Technical Writing"]
+
+
+def reply_for(prompt):
+    if "skill JSON object" in prompt:
+        return json.dumps({skill: random.randint(40, 95) for skill in SKILLS})
+    if "JSON object mapping each criterion" in prompt:
+        criteria = re.findall(r"^- ([^:]+):", prompt, re.MULTILINE)
+        return json.dumps({criterion: random.randint(30, 95) for criterion in criteria})
+    if "Rank the user's ability" in prompt:
+        return str(random.randint(30, 95))
+    if "questions to evaluate" in prompt:
+        return "\n".join(f"How do you handle situation {i} in your studies?" for i in range(1, 4))
+    if "concise description" in prompt:
+        return "A benchmark description of this course."
+    return "This is a benchmark reply from the local Groq stub. " * 4
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.5, jitter=0.0, chunks=8, chunk_delay=0.02):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with self.server._lock:
+            self.server.calls += 1
+        prompt = (body.get("messages") or [{}])[-1].get("content", "")
+        content = reply_for(prompt)
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        }
+        time.sleep(self.server.delay())
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            size = max(1, len(content) // self.server.chunks)
+            for start in range(0, len(content), size):
+                chunk = {"choices": [{"delta": {"content": content[start:start + size]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(self.server.chunk_delay)
+            final = {"choices": [{"delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}}
+            self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+            self.close_connection = True
+            return
+
+        data = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": usage,
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start(port=0, latency=0.5, jitter=0.0, chunks=8, chunk_delay=0.02):
+    """Run a stub server in a daemon thread; returns the server (its URL is
+    http://127.0.0.1:<server.server_port>/)."""
+    server = StubServer(("127.0.0.1", port), latency, jitter, chunks, chunk_delay)
+    threading.Thread(target=server.serve_forever, name="groq-stub", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before each reply (default 0.5)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- random seconds added to the latency")
+    parser.add_argument("--chunks", type=int, default=8, help="chunks per streamed reply")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    args = parser.parse_args()
+    server = StubServer(("127.0.0.1", args.port), args.latency, args.jitter, args.chunks, args.chunk_delay)
+    print(f"Groq stub listening on http://127.0.0.1:{server.server_port}/")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""Load-test every EDUSYNC route against synthetic data and a local Groq stub.
+
+Generates (or reuses) a data directory, starts the Groq stub and the app
+server, then sends a fixed number of requests to each route from a pool of
+concurrent clients and reports throughput and latency percentiles.
+
+    python benchmarks/run.py --scale 100k --concurrency 32 --requests 500
+    python benchmarks/run.py --scale 1k --json baseline.json
+    python benchmarks/run.py --scale 1k --compare baseline.json
+
+Requires the app's own dependencies plus gevent (and gunicorn for
+--server gunicorn).
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datagen  # noqa: E402
+import groq_stub  # noqa: E402
+
+
+class Context:
+    """Users to send requests as, read from the data directory."""
+
+    def __init__(self, data_dir, seed):
+        self.rng = random.Random(seed)
+        self.users = []
+        with open(os.path.join(data_dir, "users.csv"), newline="", encoding="utf-8") as f:
+            next(f)
+            for line in f:
+                fields = line.rstrip("\n").split(",")
+                # username, password, name, age, discipline, current_semester, career_goal
+                if len(fields) >= 7 and fields[1] == datagen.PASSWORD:
+                    self.users.append((fields[0], fields[4], int(fields[5])))
+        self.catalog = datagen.load_catalog(os.path.join(data_dir, "courses.csv"))
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def user(self):
+        return self.rng.choice(self.users)
+
+    def unique(self):
+        with self._lock:
+            self._counter += 1
+            return f"{os.getpid()}-{self._counter}"
+
+
+def _history(ctx):
+    username, discipline, semester = ctx.user()
+    sem = max(1, min(4, semester - 1))
+    return ("POST", "/add_history", {"json": {"username": username, "subject": {
+        "subject_code": ctx.rng.choice(ctx.catalog[discipline][sem])[0],
+        "grade": round(ctx.rng.uniform(5, 10), 1), "attendance": ctx.rng.randint(60, 100), "semester": sem,
+    }}})
+
+
+def _register(ctx):
+    return ("POST", "/register", {"json": {
+        "username": f"load-{ctx.unique()}", "password": "bench", "name": "Load User", "age": 20,
+        "discipline": "FYUGP Physics", "current_semester": 2, "career_goal": "Physicist",
+    }})
+
+
+def _chat(ctx, stream):
+    username = ctx.user()[0]
+    message = ctx.rng.choice(["How do I improve my grades?", "Which electives suit my goal?", "How should I plan my week?"])
+    return ("POST", "/chat_with_ai", {"json": {"username": username, "message": message, "stream": stream}, "stream": stream})
+
+
+ROUTES = {
+    "index": lambda ctx: ("GET", "/", {}),
+    "login": lambda ctx: ("POST", "/login", {"json": {"username": ctx.user()[0], "password": datagen.PASSWORD}}),
+    "register": _register,
+    "add_history": _history,
+    "get_history": lambda ctx: ("GET", "/get_history", {"params": {"username": ctx.user()[0]}}),
+    "update_profile": lambda ctx: ("POST", "/update_profile", {"json": {
+        "username": ctx.user()[0], "career_goal": ctx.rng.choice(datagen.CAREER_GOALS)}}),
+    "get_courses": lambda ctx: ("GET", "/get_courses", {"params": {
+        "discipline": ctx.user()[1], "semester": ctx.rng.randint(1, 4)}}),
+    "recommend_courses": lambda ctx: (lambda user: ("POST", "/recommend_courses", {"json": {
+        "username": user[0], "semester": user[2]}}))(ctx.user()),
+    "predict_grades": lambda ctx: (lambda user: ("POST", "/predict_grades", {"json": {
+        "username": user[0], "semester": min(user[2], 4), "target_grade": 85}}))(ctx.user()),
+    "generate_skill_chart": lambda ctx: ("GET", "/generate_skill_chart", {"params": {"username": ctx.user()[0]}}),
+    "psych_eval_question": lambda ctx: ("POST", "/psych_eval_question", {"json": {
+        "username": ctx.user()[0], "current_criterion": ctx.rng.choice(datagen.CRITERIA)}}),
+    "psych_eval_rank": lambda ctx: ("POST", "/psych_eval_rank", {"json": {
+        "username": ctx.user()[0], "criterion": ctx.rng.choice(datagen.CRITERIA), "response": "I plan ahead."}}),
+    "psych_eval_rank_batch": lambda ctx: ("POST", "/psych_eval_rank_batch", {"json": {
+        "username": ctx.user()[0], "responses": {c: "I plan ahead." for c in datagen.CRITERIA}}}),
+    "chat_with_ai": lambda ctx: _chat(ctx, False),
+    "chat_with_ai_stream": lambda ctx: _chat(ctx, True),
+    "metrics": lambda ctx: ("GET", "/metrics", {}),
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run_route(base_url, ctx, name, total, concurrency, warmup):
+    build = ROUTES[name]
+    local = threading.local()
+
+    def one(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, kwargs = build(ctx)
+        stream = kwargs.pop("stream", False)
+        started = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, timeout=300, stream=stream, **kwargs)
+            for _ in response.iter_content(chunk_size=None):
+                pass
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(warmup)))
+        started = time.perf_counter()
+        results = list(pool.map(one, range(total)))
+        wall = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "requests": total,
+        "errors": sum(1 for _, ok in results if not ok),
+        "throughput": total / wall if wall else 0.0,
+        "mean_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_ms": 1000 * percentile(latencies, 50),
+        "p99_ms": 1000 * percentile(latencies, 99),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, data_dir, stub_url, port):
+    env = dict(
+        os.environ,
+        GROQ_API_KEY="bench",
+        GROQ_API_URL=stub_url,
+        EDUSYNC_DATA_DIR=data_dir,
+        EDUSYNC_STORAGE=args.storage,
+        EDUSYNC_BIND=f"127.0.0.1:{port}",
+        PORT=str(port),
+        PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        # The stub answers instantly relative to real traffic; keep the
+        # client-side limiter from becoming the bottleneck being measured.
+        EDUSYNC_LLM_RATE=os.environ.get("EDUSYNC_LLM_RATE", "0"),
+    )
+    if args.storage == "sqlite":
+        subprocess.run([sys.executable, "-m", "flask", "--app", "app", "migrate-storage", "--force"],
+                       cwd=data_dir, env=env, check=True)
+    if args.server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py")]
+    else:
+        command = [sys.executable, os.path.join(ROOT, "wsgi.py")]
+    log = open(os.path.join(data_dir, "server.log"), "w")
+    process = subprocess.Popen(command, cwd=data_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with {process.returncode}; see {log.name}")
+        try:
+            requests.get(base_url + "/metrics", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"Server did not start within {args.startup_timeout}s; see {log.name}")
+
+
+def print_report(results, baseline=None):
+    header = f"{'route':<24}{'reqs':>7}{'errs':>6}{'req/s':>10}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'p50 vs base':>14}{'p99 vs base':>14}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        line = (f"{name:<24}{r['requests']:>7}{r['errors']:>6}{r['throughput']:>10.1f}"
+                f"{r['mean_ms']:>10.1f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+        base = (baseline or {}).get(name)
+        if base:
+            for key in ("p50_ms", "p99_ms"):
+                change = (r[key] - base[key]) / base[key] * 100 if base[key] else 0.0
+                line += f"{change:>+13.0f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EDUSYNC routes against a local Groq stub.")
+    parser.add_argument("--scale", default="1k", help="synthetic data size: 1k, 100k, 1m or a row count")
+    parser.add_argument("--data", help="data directory to use (generated there if it has no users.csv)")
+    parser.add_argument("--routes", default=",".join(ROUTES), help="comma-separated routes to run")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per route first")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.5, help="Groq stub latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Groq stub latency jitter in seconds")
+    parser.add_argument("--storage", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--server", choices=["wsgi", "gunicorn"], default="wsgi")
+    parser.add_argument("--url", help="benchmark an already running server instead of starting one")
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline results file to compare p50/p99 against")
+    args = parser.parse_args()
+
+    routes = [name.strip() for name in args.routes.split(",") if name.strip()]
+    unknown = [name for name in routes if name not in ROUTES]
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(unknown)}")
+
+    data_dir = args.data or os.path.join(tempfile.gettempdir(), f"edusync-bench-{args.scale}")
+    if not os.path.exists(os.path.join(data_dir, "users.csv")):
+        rows = datagen.parse_scale(args.scale)
+        datagen.generate(data_dir, rows, rows, seed=args.seed)
+    ctx = Context(data_dir, args.seed)
+
+    stub = process = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        stub = groq_stub.start(latency=args.latency, jitter=args.jitter)
+        stub_url = f"http://127.0.0.1:{stub.server_port}/"
+        process, base_url = start_server(args, data_dir, stub_url, free_port())
+
+    print(f"{len(ctx.users)} users in {data_dir}, {args.storage} storage, {args.concurrency} concurrent clients")
+    results = {}
+    try:
+        for name in routes:
+            results[name] = run_route(base_url, ctx, name, args.requests, args.concurrency, args.warmup)
+            r = results[name]
+            print(f"  {name}: {r['throughput']:.1f} req/s, p50 {r['p50_ms']:.1f} ms, p99 {r['p99_ms']:.1f} ms", flush=True)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if stub is not None:
+            stub.shutdown()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["routes"]
+    print()
+    print_report(results, baseline)
+    if stub is not None:
+        print(f"\nGroq stub calls: {stub.calls}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "routes": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+import bisect
+import csv
+import hashlib
+import io
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+NAN = float('nan')
+
+# Read as numbers even where a cell is not one (it becomes NaN)
+NUMERIC_COLUMNS = ('Semester', 'Credits')
+# Repetitive text kept once per distinct value plus an int32 code per row
+CATEGORICAL_COLUMNS = ('Discipline', 'Category')
+# Cells read as missing, as pandas does by default
+NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+])
+SNAPSHOT_MAGIC = b"EDUCAT2\n"
+# Searchable fields: the column each is built from and its weight in ranking
+SEARCH_FIELDS = {
+    'code': ('Course Code', 4.0),
+    'title': ('Course Title', 3.0),
+    'discipline': ('Discipline', 2.0),
+    'category': ('Category', 1.5),
+}
+# Share of a field's weight earned by a term that is only a prefix of a token
+PREFIX_WEIGHT = 0.5
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class _FieldIndex:
+    """One field's tokens in sorted order, with the row ids of each token
+    stored back to back in `rows` (from starts[i] to starts[i + 1]). The
+    rows of every token sharing a prefix are then a single slice, found
+    with two binary searches."""
+
+    def __init__(self, vocabulary, starts, rows):
+        self.vocabulary = vocabulary
+        self.starts = starts
+        self.rows = rows
+
+    @classmethod
+    def build(cls, texts):
+        postings = {}
+        for row_id, text in enumerate(texts):
+            if text == text:  # skip NaN
+                for token in dict.fromkeys(tokenize(text)):
+                    postings.setdefault(token, []).append(row_id)
+        vocabulary = sorted(postings)
+        starts = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum([len(postings[token]) for token in vocabulary], out=starts[1:])
+        rows = np.array([row_id for token in vocabulary for row_id in postings[token]], dtype=np.int32)
+        return cls(vocabulary, starts, rows)
+
+    def lookup(self, term):
+        """(rows with a token starting with term, rows with exactly term)."""
+        lo = bisect.bisect_left(self.vocabulary, term)
+        hi = bisect.bisect_left(self.vocabulary, term + '\uffff', lo)
+        prefixed = self.rows[self.starts[lo]:self.starts[hi]]
+        if lo < hi and self.vocabulary[lo] == term:
+            return prefixed, self.rows[self.starts[lo]:self.starts[lo + 1]]
+        return prefixed, self.rows[:0]
+
+
+class SearchIndex:
+    """Inverted index over the catalog's codes, titles, disciplines and
+    categories. Query terms match tokens they are a prefix of."""
+
+    def __init__(self, fields, rows):
+        self.fields = fields
+        self.rows = rows
+
+    @classmethod
+    def build(cls, catalog):
+        return cls({name: _FieldIndex.build(catalog._values(column))
+                    for name, (column, _) in SEARCH_FIELDS.items()}, catalog.rows)
+
+    def match(self, terms, field):
+        """Mask of rows where every term matches a token of field."""
+        mask = np.ones(self.rows, dtype=bool)
+        for term in terms:
+            hits = np.zeros(self.rows, dtype=bool)
+            hits[self.fields[field].lookup(term)[0]] = True
+            mask &= hits
+        return mask
+
+    def rank(self, terms):
+        """(score, number of terms matched) per row. A term scores its best
+        field's weight (PREFIX_WEIGHT of it for a prefix match) times its
+        inverse document frequency."""
+        scores = np.zeros(self.rows)
+        matched = np.zeros(self.rows, dtype=np.int32)
+        for term in terms:
+            term_scores = np.zeros(self.rows)
+            for name, (_, weight) in SEARCH_FIELDS.items():
+                prefixed, exact = self.fields[name].lookup(term)
+                field_scores = np.zeros(self.rows)
+                field_scores[prefixed] = weight * PREFIX_WEIGHT
+                field_scores[exact] = weight
+                np.maximum(term_scores, field_scores, out=term_scores)
+            hits = term_scores > 0
+            found = np.count_nonzero(hits)
+            if found:
+                scores += term_scores * math.log(1 + self.rows / found)
+                matched += hits
+        return scores, matched
+
+
+def _uncommented(lines):
+    """Lines cut at the first '/' outside quotes, skipping any left blank
+    (courses.csv uses '/' to start comments)."""
+    for line in lines:
+        if '/' in line:
+            quoted = False
+            for i, char in enumerate(line):
+                if char == '"':
+                    quoted = not quoted
+                elif char == '/' and not quoted:
+                    line = line[:i]
+                    break
+        if line.strip():
+            yield line
+
+
+def _is_int(text):
+    try:
+        int(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _to_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _column(name, cells):
+    """(kind, values, categories) for one column of text cells: int64 or
+    float64 arrays for numbers, int32 codes into sorted categories for
+    CATEGORICAL_COLUMNS, and a list (None where missing) for other text."""
+    cells = [None if cell in NA_VALUES else cell for cell in cells]
+    if name in CATEGORICAL_COLUMNS:
+        categories = sorted({cell for cell in cells if cell is not None})
+        lookup = {category: code for code, category in enumerate(categories)}
+        return 'category', np.array([lookup.get(cell, -1) for cell in cells], dtype=np.int32), categories
+    present = [cell for cell in cells if cell is not None]
+    numbers = [None if cell is None else _to_float(cell) for cell in cells]
+    if name not in NUMERIC_COLUMNS and any(number is None for number, cell in zip(numbers, cells) if cell is not None):
+        return 'text', cells, None
+    if len(present) == len(cells) and all(_is_int(cell) for cell in present):
+        return 'int', np.array([int(cell) for cell in cells], dtype=np.int64), None
+    return 'float', np.array([NAN if number is None else number for number in numbers], dtype=np.float64), None
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _aligned(offset):
+    return -(-offset // 8) * 8
+
+
+class CourseCatalog:
+    """Read-only view of courses.csv, indexed once at startup.
+
+    Columns are stored compactly rather than as a row of Python objects per
+    course: numbers in fixed-width NumPy arrays, discipline and category as
+    codes into a table of distinct values. Records are built on request.
+    """
+
+    def __init__(self, columns, version=None, modified=None, index=None):
+        # version identifies the catalog's content and modified is the source
+        # file's mtime, for HTTP validators on responses built from it
+        self.version = version
+        self.modified = modified
+        self._columns = columns
+        self.columns = list(columns)
+        self.rows = len(next(iter(columns.values()))[1]) if columns else 0
+        self.by_semester = {}
+        self._row_by_code = {}
+        self._titles = self._values('Course Title')
+        self._lowered = None
+        for row_id, (code, semester) in enumerate(zip(self._values('Course Code'), self._values('Semester'))):
+            if code == code:
+                self._row_by_code.setdefault(code, row_id)
+            if semester == semester:  # skip NaN
+                self.by_semester.setdefault(int(semester), []).append(row_id)
+        self.index = index if index is not None else SearchIndex.build(self)
+
+        codes = sorted(self._row_by_code)
+        self._sorted_codes = np.array(codes, dtype=str)
+        self._sorted_rows = np.array([self._row_by_code[code] for code in codes], dtype=np.int64)
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+            modified = os.fstat(f.fileno()).st_mtime
+        reader = csv.reader(_uncommented(io.StringIO(data.decode('utf-8'), newline='')), skipinitialspace=True)
+        header = next(reader, [])
+        rows = [row + [''] * (len(header) - len(row)) for row in reader]
+        cells = zip(*rows) if rows else [()] * len(header)
+        return cls(
+            {name: _column(name, column) for name, column in zip(header, cells)},
+            version=hashlib.sha1(data).hexdigest()[:16], modified=modified
+        )
+
+    @classmethod
+    def from_snapshot(cls, path, source=None):
+        """Load a snapshot written by save_snapshot(), memory-mapping its
+        arrays so worker processes share one copy. Returns None if `source`
+        has changed since the snapshot was taken."""
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start = len(SNAPSHOT_MAGIC)
+        if data[:start] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a course catalog snapshot")
+        size = int.from_bytes(data[start:start + 8], 'little')
+        header = json.loads(data[start + 8:start + 8 + size])
+        if source is not None and header['source'] != _fingerprint(source):
+            return None
+        base = _aligned(start + 8 + size)
+
+        def array(ref):
+            return np.frombuffer(data, dtype=ref['dtype'], count=ref['count'], offset=base + ref['offset'])
+
+        columns = {}
+        for entry in header['columns']:
+            if entry['kind'] == 'text':
+                columns[entry['name']] = ('text', entry['values'], None)
+            else:
+                columns[entry['name']] = (entry['kind'], array(entry), entry.get('categories'))
+        index = SearchIndex({
+            name: _FieldIndex(field['vocabulary'], array(field['starts']), array(field['rows']))
+            for name, field in header['index'].items()
+        }, header['rows'])
+        return cls(columns, version=header.get('version'), modified=header.get('modified'), index=index)
+
+    @classmethod
+    def load(cls, path, snapshot=None):
+        """The catalog from `snapshot` if it exists and is up to date with
+        the CSV at `path`, otherwise from the CSV."""
+        if snapshot and os.path.exists(snapshot):
+            try:
+                catalog = cls.from_snapshot(snapshot, source=path)
+            except (OSError, ValueError):
+                logger.exception("Ignoring unreadable catalog snapshot %s", snapshot)
+            else:
+                if catalog is not None:
+                    return catalog
+                logger.warning("Catalog snapshot %s is older than %s; reading the CSV", snapshot, path)
+        return cls.from_csv(path)
+
+    def save_snapshot(self, path, source=None):
+        """Write the catalog to `path` for from_snapshot(), recording the
+        size and modification time of `source` to detect staleness."""
+        header = {
+            "source": _fingerprint(source) if source else None,
+            "version": self.version, "modified": self.modified, "rows": self.rows, "columns": [], "index": {},
+        }
+        blobs = []
+
+        def array(values):
+            offset = _aligned(blobs[-1][0] + len(blobs[-1][1])) if blobs else 0
+            blobs.append((offset, np.ascontiguousarray(values).tobytes()))
+            return {"dtype": values.dtype.str, "count": len(values), "offset": offset}
+
+        for name in self.columns:
+            kind, values, categories = self._columns[name]
+            entry = {"name": name, "kind": kind}
+            if kind == 'text':
+                entry["values"] = list(values)
+            else:
+                entry.update(array(values), categories=categories)
+            header["columns"].append(entry)
+        for name, field in self.index.fields.items():
+            header["index"][name] = {
+                "vocabulary": field.vocabulary, "starts": array(field.starts), "rows": array(field.rows),
+            }
+        encoded = json.dumps(header).encode('utf-8')
+        base = _aligned(len(SNAPSHOT_MAGIC) + 8 + len(encoded))
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(SNAPSHOT_MAGIC + len(encoded).to_bytes(8, 'little') + encoded)
+                for blob_offset, blob in blobs:
+                    f.seek(base + blob_offset)
+                    f.write(blob)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _values(self, name):
+        """A column as the Python values records hold (NaN where missing)."""
+        if name not in self._columns:
+            return [NAN] * self.rows
+        kind, values, categories = self._columns[name]
+        if kind == 'category':
+            return [categories[code] if code >= 0 else NAN for code in values.tolist()]
+        if kind == 'text':
+            return [NAN if value is None else value for value in values]
+        return values.tolist()
+
+    def _value(self, name, row_id):
+        kind, values, categories = self._columns[name]
+        value = values[row_id]
+        if kind == 'category':
+            return categories[value] if value >= 0 else NAN
+        if kind == 'text':
+            return NAN if value is None else value
+        return value.item()
+
+    def record(self, row_id):
+        return {name: self._value(name, row_id) for name in self.columns}
+
+    @property
+    def records(self):
+        """Every course as a dict of column values, in catalog order."""
+        return [dict(zip(self.columns, row)) for row in zip(*(self._values(name) for name in self.columns))]
+
+    def column(self, name):
+        """A numeric column as a read-only NumPy array."""
+        kind, values, _ = self._columns[name]
+        if kind not in ('int', 'float'):
+            raise TypeError(f"{name} is not a numeric column")
+        return values
+
+    def distinct(self, name):
+        """The distinct non-missing values of a column."""
+        kind, values, categories = self._columns[name]
+        if kind == 'category':
+            return list(categories)
+        return sorted({value for value in self._values(name) if value == value})
+
+    def first_rows(self):
+        """(course codes, row id of each code's first row)."""
+        return self._sorted_codes.tolist(), self._sorted_rows
+
+    def get(self, course_code):
+        row_id = self._row_by_code.get(course_code)
+        return None if row_id is None else self.record(row_id)
+
+    def course_info(self, codes):
+        """(title, credits) for each code, or None where the code is not in
+        the catalog, looked up for the whole batch at once."""
+        if not len(self._sorted_codes):
+            return [None] * len(codes)
+        if not len(codes):
+            return []
+        query = np.array([str(code) for code in codes], dtype=str)
+        positions = np.searchsorted(self._sorted_codes, query).clip(max=len(self._sorted_codes) - 1)
+        found = (self._sorted_codes[positions] == query).tolist()
+        rows = self._sorted_rows[positions]
+        credits = self.column('Credits')[rows].tolist()
+        return [
+            (self._titles[row], credit) if hit else None
+            for row, credit, hit in zip(rows.tolist(), credits, found)
+        ]
+
+    def semester(self, semester):
+        return [self.record(i) for i in self.by_semester.get(int(semester), [])]
+
+    def _lowered_text(self):
+        """(discipline, title) of every row in lower case, for substring
+        matching."""
+        if self._lowered is None:
+            self._lowered = [
+                (discipline.lower() if discipline == discipline else '', title.lower() if title == title else '')
+                for discipline, title in zip(self._values('Discipline'), self._titles)
+            ]
+        return self._lowered
+
+    def search(self, search_term, semester):
+        """Courses in a semester whose discipline or title contains
+        search_term, or every word of it as word prefixes (case-insensitive),
+        in catalog order. Returned records are copies and safe to modify."""
+        term = str(search_term).strip().lower()
+        if not term:
+            return []
+        semester = int(semester)
+        if semester not in self.by_semester:
+            return []
+        query_tokens = tokenize(term)
+        if query_tokens:
+            mask = self.index.match(query_tokens, 'discipline') | self.index.match(query_tokens, 'title')
+            mask &= self.column('Semester') == semester
+        else:
+            mask = np.zeros(self.rows, dtype=bool)
+        # Substrings inside words too, e.g. "physics" in "Biophysics"
+        lowered = self._lowered_text()
+        mask[[row for row in self.by_semester[semester] if term in lowered[row][0] or term in lowered[row][1]]] = True
+        return [self.record(i) for i in np.flatnonzero(mask).tolist()]
+
+    def query(self, text, semester=None, category=None, mandatory=None, offset=0, limit=20):
+        """Ranked search over course codes, titles, disciplines and
+        categories, optionally limited to a semester, a category and
+        mandatory (or optional) courses. Courses matching more of the terms
+        come first, then higher scores, then catalog order; with no terms
+        every course passing the filters is returned in catalog order.
+        Returns (total matches, records for offset:offset + limit), each
+        record with its "Score"."""
+        terms = list(dict.fromkeys(tokenize(text or '')))
+        scores, matched = self.index.rank(terms)
+        keep = matched > 0 if terms else np.ones(self.rows, dtype=bool)
+        if semester is not None:
+            keep &= self.column('Semester') == semester
+        if category is not None:
+            _, codes, categories = self._columns['Category']
+            wanted = [code for code, name in enumerate(categories) if name.lower() == str(category).lower()]
+            keep &= codes == (wanted[0] if wanted else -2)
+        if mandatory is not None:
+            keep &= (self.column('Mandatory') == 1.0) == bool(mandatory)
+        ids = np.flatnonzero(keep)
+        order = np.lexsort((ids, -scores[ids], -matched[ids]))
+        page = ids[order[offset:offset + limit]]
+        return len(ids), [dict(self.record(i), Score=round(float(scores[i]), 3)) for i in page.tolist()]
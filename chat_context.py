@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from storage import SidecarDB
+
+# Rough token budget for the student summary sent with every chat message
+CONTEXT_TOKENS = int(os.environ.get("EDUSYNC_CHAT_CONTEXT_TOKENS", "300"))
+# Students whose summary each process keeps
+MAX_USERS = int(os.environ.get("EDUSYNC_CHAT_CONTEXT_USERS", "1024"))
+# Rough token budget for the earlier turns sent with a message; the latest
+# turn is always kept even if it is larger
+MEMORY_TOKENS = int(os.environ.get("EDUSYNC_CHAT_MEMORY_TOKENS", "1000"))
+MEMORY_DB = os.environ.get("EDUSYNC_CHAT_DB", "chat_memory.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_turns_username_id ON chat_turns (username, id);
+"""
+
+
+def estimate_tokens(text):
+    """Rough token count for budgeting: about four characters per token."""
+    return (len(text) + 3) // 4
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number == number else None
+
+
+def profile_line(user):
+    parts = []
+    if user.get('age'):
+        parts.append(f"age {user['age']}")
+    if user.get('discipline'):
+        parts.append(user['discipline'])
+    if user.get('current_semester'):
+        parts.append(f"semester {user['current_semester']}")
+    if user.get('career_goal'):
+        parts.append(f"career goal: {user['career_goal']}")
+    return "Student: " + (", ".join(parts) or "no profile details")
+
+
+def psych_line(scores):
+    if not scores:
+        return None
+    ranked = sorted(scores.items(), key=lambda item: -item[1])
+    return "Psychological profile (out of 100, strongest first): " + ", ".join(
+        f"{criterion} {score}" for criterion, score in ranked
+    )
+
+
+def history_lines(history):
+    """An overall line, then one line per semester, most recent first.
+    history is records with subject_code, course_title, grade, attendance
+    and semester."""
+    semesters = {}
+    for record in history:
+        grade = _number(record.get('grade'))
+        if grade is None:
+            continue
+        name = record.get('course_title') or record.get('subject_code') or "Unknown Course"
+        semesters.setdefault(str(record.get('semester', '')), []).append(
+            (grade, _number(record.get('attendance')), name)
+        )
+    if not semesters:
+        return []
+
+    grades = [grade for courses in semesters.values() for grade, _, _ in courses]
+    lines = [
+        f"Academic history: {len(grades)} courses over {len(semesters)} semesters, "
+        f"average grade {sum(grades) / len(grades):.1f}"
+    ]
+    for semester in sorted(semesters, key=lambda s: (_number(s) or 0, s), reverse=True):
+        courses = semesters[semester]
+        line = f"Semester {semester}: {len(courses)} courses, average grade {sum(c[0] for c in courses) / len(courses):.1f}"
+        attendance = [c[1] for c in courses if c[1] is not None]
+        if attendance:
+            line += f", attendance {sum(attendance) / len(attendance):.0f}%"
+        if len(courses) > 1:
+            best, weakest = max(courses), min(courses)
+            line += f"; best {best[2]} ({best[0]:g}), weakest {weakest[2]} ({weakest[0]:g})"
+        lines.append(line)
+    return lines
+
+
+def summarize(user, scores, history, budget=CONTEXT_TOKENS):
+    """A compact description of the student within about `budget` tokens:
+    profile, psych scores, then academic history. Lines that would go over
+    the budget are left out, so the oldest semesters go first."""
+    lines = [profile_line(user)]
+    used = estimate_tokens(lines[0])
+    for line in [psych_line(scores), *history_lines(history)]:
+        if line is None:
+            continue
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            continue
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
+
+
+class ChatContexts:
+    """Per-student chat summaries for this process, each rebuilt only when
+    its version changes. Least recently used students are dropped past
+    max_users."""
+
+    def __init__(self, max_users=MAX_USERS):
+        self.max_users = max_users
+        self.hits = 0
+        self.misses = 0
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def summary(self, username, version, build):
+        """The student's summary, from build() if none was made for this
+        version yet."""
+        with self._lock:
+            cached = self._summaries.get(username)
+            if cached is not None and cached[0] == version:
+                self._summaries.move_to_end(username)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        summary = build()
+        with self._lock:
+            self._summaries[username] = (version, summary)
+            self._summaries.move_to_end(username)
+            while len(self._summaries) > self.max_users:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._summaries)}
+
+
+class ChatMemory:
+    """The latest turns of each student's conversation, kept in SQLite and
+    trimmed to the token budget, oldest first. The most recent turn is
+    always kept."""
+
+    def __init__(self, path=MEMORY_DB, budget=MEMORY_TOKENS):
+        self.path = path
+        self.budget = budget
+        self._db = SidecarDB(path, SCHEMA)
+        self._lock = threading.Lock()
+
+    def messages(self, username):
+        """Earlier turns as chat messages, oldest first."""
+        with self._lock:
+            rows = self._db.connection().execute(
+                "SELECT question, answer FROM chat_turns WHERE username = ? ORDER BY id", (username,)
+            ).fetchall()
+        messages = []
+        for question, answer in rows:
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
+
+    def remember(self, username, question, answer):
+        tokens = estimate_tokens(question) + estimate_tokens(answer)
+        with self._lock:
+            conn = self._db.connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO chat_turns (username, question, answer, tokens, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (username, question, answer, tokens, time.time())
+                )
+                kept = 0
+                oldest = None
+                for turn_id, turn_tokens in conn.execute(
+                    "SELECT id, tokens FROM chat_turns WHERE username = ? ORDER BY id DESC", (username,)
+                ).fetchall():
+                    if oldest is not None and kept + turn_tokens > self.budget:
+                        break
+                    kept += turn_tokens
+                    oldest = turn_id
+                conn.execute("DELETE FROM chat_turns WHERE username = ? AND id < ?", (username, oldest))
+
+    def forget(self, username):
+        """Clear the student's conversation."""
+        with self._lock:
+            conn = self._db.connection()
+            with conn:
+                conn.execute("DELETE FROM chat_turns WHERE username = ?", (username,))
+
+
+contexts = ChatContexts()
+memory = ChatMemory()
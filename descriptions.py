@@ -0,0 +1,184 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from llm import get_groq_responses
+from storage import SidecarDB
+
+MAX_DESCRIPTION_LENGTH = 80
+FALLBACK_DESCRIPTION = "Description not available."
+
+CACHE_PATH = os.environ.get("EDUSYNC_DESCRIPTION_DB", "course_descriptions.db")
+LRU_SIZE = int(os.environ.get("EDUSYNC_DESCRIPTION_LRU_SIZE", "4096"))
+WARM_BATCH_SIZE = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS course_descriptions (
+    course_code TEXT PRIMARY KEY,
+    course_title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def description_prompt(record):
+    return (
+        f"Generate a concise description (under 80 characters) for the course: "
+        f"{record['Course Code']} - {record['Course Title']}."
+    )
+
+
+def clean_description(api_response):
+    description = (api_response or {}).get("response", "").strip()
+    if len(description) > MAX_DESCRIPTION_LENGTH:
+        description = description[:MAX_DESCRIPTION_LENGTH] + "..."
+    return description if description else FALLBACK_DESCRIPTION
+
+
+class DescriptionCache:
+    """Course descriptions keyed by course code, stored in SQLite with an
+    in-process LRU in front. An entry only counts as a hit while the stored
+    course title still matches, so renaming a course regenerates it."""
+
+    def __init__(self, path=CACHE_PATH, lru_size=LRU_SIZE):
+        self.path = path
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = SidecarDB(path, SCHEMA)
+
+    def _remember(self, code, title, description):
+        self._lru[code] = (title, description)
+        self._lru.move_to_end(code)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get(self, code, title):
+        with self._lock:
+            cached = self._lru.get(code)
+            if cached is not None and cached[0] == title:
+                self._lru.move_to_end(code)
+                return cached[1]
+            row = self._db.connection().execute(
+                "SELECT course_title, description FROM course_descriptions WHERE course_code = ?",
+                (code,)
+            ).fetchone()
+            if row is None or row[0] != title:
+                return None
+            self._remember(code, title, row[1])
+            return row[1]
+
+    def set_many(self, entries):
+        """Store (code, title, description) tuples."""
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._db.connection()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO course_descriptions "
+                        "(course_code, course_title, description, updated_at) VALUES (?, ?, ?, ?)",
+                        [(code, title, description, now) for code, title, description in entries]
+                    )
+            except sqlite3.OperationalError:
+                # Another process held the file past the busy timeout; the
+                # descriptions stay cached in memory.
+                pass
+            for code, title, description in entries:
+                self._remember(code, title, description)
+
+
+cache = DescriptionCache()
+
+
+def _generate(records):
+    """Fetch descriptions for records in one concurrent batch and store them.
+    Returns {course_code: description} for the calls that succeeded; a
+    failed call's error text is never used as a description."""
+    responses = get_groq_responses([description_prompt(record) for record in records])
+    generated = {}
+    entries = []
+    for record, api_response in zip(records, responses):
+        if not api_response or api_response.get("error"):
+            continue
+        description = clean_description(api_response)
+        if description != FALLBACK_DESCRIPTION:
+            generated[record["Course Code"]] = description
+            entries.append((record["Course Code"], record["Course Title"], description))
+    cache.set_many(entries)
+    return generated
+
+
+def describe_courses(records, generate=True):
+    """Fill in record["Description"] for every course record. Cached
+    descriptions are used as-is; the rest are fetched from the LLM in one
+    concurrent batch, or left as FALLBACK_DESCRIPTION if not generate or
+    the call failed. Returns whether every record got a real description."""
+    found = {}
+    missing = {}
+    for record in records:
+        code = record["Course Code"]
+        description = cache.get(code, record["Course Title"])
+        if description is not None:
+            found[code] = description
+        else:
+            missing.setdefault(code, record)
+
+    if missing and generate:
+        found.update(_generate(list(missing.values())))
+
+    complete = True
+    for record in records:
+        description = found.get(record["Course Code"])
+        record["Description"] = FALLBACK_DESCRIPTION if description is None else description
+        complete = complete and description is not None
+    return complete
+
+
+_generating = set()
+_generating_lock = threading.Lock()
+
+
+def generate_later(records):
+    """Generate and store the descriptions records are missing on a
+    background thread, skipping courses already being generated."""
+    with _generating_lock:
+        batch = {}
+        for record in records:
+            code = record["Course Code"]
+            if code not in _generating and code not in batch and cache.get(code, record["Course Title"]) is None:
+                batch[code] = record
+        _generating.update(batch)
+    if not batch:
+        return
+
+    def run():
+        try:
+            _generate(list(batch.values()))
+        finally:
+            with _generating_lock:
+                _generating.difference_update(batch)
+    threading.Thread(target=run, name="describe-later", daemon=True).start()
+
+
+def warm(records, batch_size=WARM_BATCH_SIZE, log=print):
+    """Generate and store descriptions for every record not already cached."""
+    pending = {}
+    for record in records:
+        if cache.get(record["Course Code"], record["Course Title"]) is None:
+            pending.setdefault(record["Course Code"], record)
+    pending = list(pending.values())
+    log(f"{len(pending)} course descriptions to generate.")
+
+    stored = 0
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        _generate(batch)
+        stored += sum(1 for record in batch if cache.get(record["Course Code"], record["Course Title"]) is not None)
+        log(f"{min(start + batch_size, len(pending))}/{len(pending)} processed, {stored} stored.")
+    return stored
@@ -0,0 +1,12 @@
+import os
+
+# Cooperative gevent workers: while a request waits on Groq it yields to the
+# other requests in the same process instead of pinning an OS thread, so one
+# worker can hold hundreds of in-flight LLM calls.
+bind = os.environ.get("EDUSYNC_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("EDUSYNC_WORKERS", "2"))
+worker_class = "gevent"
+worker_connections = int(os.environ.get("EDUSYNC_WORKER_CONNECTIONS", "500"))
+# Must outlast the slowest LLM call, including streamed chat replies.
+timeout = int(os.environ.get("EDUSYNC_WORKER_TIMEOUT", "120"))
+wsgi_app = "wsgi:app"
@@ -0,0 +1,310 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from storage import SidecarDB
+
+logger = logging.getLogger(__name__)
+
+JOB_DB = os.environ.get("EDUSYNC_JOB_DB", "jobs.db")
+WORKERS = int(os.environ.get("EDUSYNC_JOB_WORKERS", "4"))
+# Each process marks the jobs it owns as alive this often. A queued or
+# running job whose process is gone, or has not done so for STALE_AFTER
+# seconds, is taken over by another (up to MAX_ATTEMPTS runs in all).
+HEARTBEAT_INTERVAL = float(os.environ.get("EDUSYNC_JOB_HEARTBEAT", "15"))
+STALE_AFTER = float(os.environ.get("EDUSYNC_JOB_TIMEOUT", "120"))
+MAX_ATTEMPTS = 3
+# Seconds a finished job's result stays available for polling
+RETENTION = float(os.environ.get("EDUSYNC_JOB_RETENTION", "86400"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    username TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    heartbeat REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active ON jobs (kind, username, semester)
+    WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_jobs_status_updated ON jobs (status, updated_at);
+"""
+
+HOST = socket.gethostname()
+_process = (None, None)
+
+
+def _owner():
+    """host:pid:token naming this process; the token tells it apart from an
+    earlier process that had the same pid."""
+    global _process
+    pid = os.getpid()
+    if _process[0] != pid:
+        _process = (pid, f"{HOST}:{pid}:{uuid.uuid4().hex[:8]}")
+    return _process[1]
+
+
+def _alive(row, now):
+    """Whether the process that owns an active job is still there to run it."""
+    owner = row["owner"]
+    if owner == _owner():
+        return True
+    if not owner or row["heartbeat"] is None or row["heartbeat"] < now - STALE_AFTER:
+        return False
+    host, pid, _ = owner.rsplit(":", 2)
+    if host != HOST or os.name != "posix":
+        return True
+    if int(pid) == os.getpid():
+        return False  # an earlier process with this pid
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _public(row):
+    job = {
+        "id": row["id"],
+        "kind": row["kind"],
+        "username": row["username"],
+        "semester": row["semester"] or None,
+        "status": row["status"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+    if row["status"] == "done":
+        job["result"] = json.loads(row["result"])
+    elif row["status"] == "failed":
+        job["error"] = row["error"]
+    return job
+
+
+class JobQueue:
+    """Background jobs kept in an SQLite table and run by a thread pool in
+    each process.
+
+    A handler takes the job's params and returns (payload, status) like a
+    view; a status of 400 or more fails the job with payload["error"]. At
+    most one job per (kind, username, semester) is queued or running at a
+    time: submitting a duplicate returns the existing job. The table is
+    shared by every worker process, so any of them can answer a poll.
+
+    Each job is owned by the process that queued or claimed it, which keeps
+    a heartbeat on it. A job whose owner is gone is taken over when it is
+    polled, by a new submission of the same work (which replaces it) and by
+    every process's periodic recover().
+    """
+
+    def __init__(self, path=JOB_DB, workers=WORKERS):
+        self.path = path
+        self.workers = workers
+        self.handlers = {}
+        self._db = SidecarDB(path, SCHEMA, row_factory=sqlite3.Row)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._migrated = False
+        self._heartbeat_pid = None
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def _connection(self):
+        conn = self._db.connection()
+        if not self._migrated:
+            # Queues created before jobs recorded the process that owns them
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+                if column not in columns:
+                    try:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+                    except sqlite3.OperationalError as e:
+                        if "duplicate column" not in str(e):
+                            raise
+            self._migrated = True
+        return conn
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat_pid == os.getpid():
+                return
+            self._heartbeat_pid = os.getpid()
+        threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True).start()
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            try:
+                with self._lock:
+                    conn = self._connection()
+                    with conn:
+                        conn.execute(
+                            "UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status IN ('queued', 'running')",
+                            (time.time(), _owner())
+                        )
+                self.recover()
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+    def _take_over(self, conn, row, now):
+        """Queue an active job whose owner is gone again under this process,
+        or fail it once it has had MAX_ATTEMPTS runs. Returns whether it was
+        queued; False too if another process took it over first."""
+        guard = (row["id"], row["status"], row["owner"], row["heartbeat"])
+        where = "WHERE id = ? AND status = ? AND owner IS ? AND heartbeat IS ?"
+        if row["attempts"] >= MAX_ATTEMPTS:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Job timed out.', updated_at = ? " + where,
+                (now, *guard)
+            )
+            return False
+        return conn.execute(
+            "UPDATE jobs SET status = 'queued', owner = ?, heartbeat = ?, updated_at = ? " + where,
+            (_owner(), now, now, *guard)
+        ).rowcount > 0
+
+    def _schedule(self, job_id):
+        self._start_heartbeat()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._executor.submit(self._run, job_id)
+
+    def submit(self, kind, username, semester, params):
+        """Queue a job, or find the queued or running one with the same
+        kind, user and semester. A pending job whose owner is gone is failed
+        and replaced. Returns (job, created)."""
+        semester = "" if semester is None else str(semester)
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (now - RETENTION,)
+                )
+                pending = conn.execute(
+                    "SELECT * FROM jobs WHERE kind = ? AND username = ? AND semester = ? "
+                    "AND status IN ('queued', 'running')",
+                    (kind, username, semester)
+                ).fetchone()
+                if pending is not None and not _alive(pending, now):
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = 'Job was interrupted.', updated_at = ? "
+                        "WHERE id = ? AND status IN ('queued', 'running')",
+                        (now, pending["id"])
+                    )
+                try:
+                    conn.execute(
+                        "INSERT INTO jobs (id, kind, username, semester, params, status, owner, heartbeat, "
+                        "created_at, updated_at) VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?, ?)",
+                        (job_id, kind, username, semester, json.dumps(params), _owner(), now, now, now)
+                    )
+                    created = True
+                except sqlite3.IntegrityError:
+                    created = False
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE kind = ? AND username = ? AND semester = ? ORDER BY created_at DESC LIMIT 1",
+                (kind, username, semester)
+            ).fetchone()
+        if created:
+            self._schedule(job_id)
+        return _public(row), created
+
+    def get(self, job_id):
+        """The job, taken over first if its owner is gone."""
+        now = time.time()
+        queued = False
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and row["status"] in ("queued", "running") and not _alive(row, now):
+                with conn:
+                    queued = self._take_over(conn, row, now)
+                row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if queued:
+            self._schedule(job_id)
+        return _public(row) if row is not None else None
+
+    def _finish(self, job_id, attempt, status, result=None, error=None):
+        """Record the outcome of a run, unless the job was taken over or
+        replaced while it ran."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? "
+                    "WHERE id = ? AND status = 'running' AND owner = ? AND attempts = ?",
+                    (status, None if result is None else json.dumps(result), error, time.time(),
+                     job_id, _owner(), attempt)
+                )
+
+    def _run(self, job_id):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                claimed = conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, heartbeat = ?, updated_at = ? "
+                    "WHERE id = ? AND status = 'queued' AND owner = ?",
+                    (now, now, job_id, _owner())
+                ).rowcount
+            row = conn.execute("SELECT kind, params, attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not claimed or row is None:
+            return  # taken over or replaced before it started
+        attempt = row["attempts"]
+
+        timings = metrics.start_request(f"job:{row['kind']}")
+        status = 500
+        try:
+            handler = self.handlers.get(row["kind"])
+            if handler is None:
+                self._finish(job_id, attempt, "failed", error=f"Unknown job kind: {row['kind']}")
+                return
+            payload, status = handler(json.loads(row["params"]))
+            if status >= 400:
+                self._finish(job_id, attempt, "failed", error=payload.get("error", "Job failed."))
+            else:
+                self._finish(job_id, attempt, "done", result=payload)
+        except Exception:
+            logger.exception("Job %s (%s) failed", job_id, row["kind"])
+            self._finish(job_id, attempt, "failed", error="Job failed.")
+        finally:
+            metrics.finish_request(timings, "JOB", status)
+
+    def recover(self):
+        """Take over every queued or running job whose owner is gone and
+        start it here, then keep doing so every HEARTBEAT_INTERVAL seconds.
+        Safe to call from several processes: each job is taken over by one.
+        Returns how many jobs were started."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            pending = conn.execute("SELECT * FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+            queued = []
+            with conn:
+                for row in pending:
+                    if not _alive(row, now) and self._take_over(conn, row, now):
+                        queued.append(row["id"])
+        for job_id in queued:
+            self._schedule(job_id)
+        self._start_heartbeat()
+        return len(queued)
+
+queue = JobQueue()
@@ -0,0 +1,98 @@
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class AppendJournal:
+    """Write-behind buffer for CSV appends.
+
+    Rows are queued in memory and handed to write_batch(name, fieldnames,
+    rows) by a background thread every `interval` seconds (sooner once
+    `max_pending` rows are waiting), so many requests share one open and
+    fsync. Queued rows stay visible through snapshot() until they are on
+    disk, and everything is flushed at interpreter exit. A crash can lose
+    at most the last interval's worth of rows.
+    """
+
+    def __init__(self, write_batch, interval=1.0, max_pending=500):
+        self.write_batch = write_batch
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._fieldnames = {}
+        self._count = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="append-journal", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def append(self, name, fieldnames, row):
+        with self._lock:
+            self._pending.setdefault(name, []).append(row)
+            self._fieldnames[name] = fieldnames
+            self._count += 1
+            self._start()
+            if self._count >= self.max_pending:
+                self._wakeup.set()
+
+    def snapshot(self, name, read_file):
+        """Rows from read_file() followed by rows still queued for name.
+
+        The file is read without holding the lock; if a flush completed in
+        the meantime the read is retried, so no row is seen twice or missed.
+        """
+        while True:
+            with self._lock:
+                generation = self._generation
+                pending = [dict(row) for row in self._pending.get(name, [])]
+            rows = list(read_file())
+            with self._lock:
+                if self._generation == generation:
+                    return rows + pending
+
+    def pending(self, name, measure):
+        """(measure(), copies of the rows still queued for name), taken
+        together while no flush is writing, so the file as measured plus
+        those rows is exactly the current state."""
+        with self._lock:
+            return measure(), [dict(row) for row in self._pending.get(name, [])]
+
+    def pending_count(self, name):
+        with self._lock:
+            return len(self._pending.get(name, ()))
+
+    def flush(self):
+        # Appends wait while a flush is writing; the generation bump tells
+        # concurrent snapshot() calls to re-read the file.
+        with self._lock:
+            for name in list(self._pending):
+                rows = self._pending[name]
+                if rows:
+                    try:
+                        self.write_batch(name, self._fieldnames[name], rows)
+                    except Exception:
+                        logger.exception("Failed to flush %d rows to %s; will retry", len(rows), name)
+                        continue
+                del self._pending[name]
+            self._generation += 1
+            self._count = sum(len(rows) for rows in self._pending.values())
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
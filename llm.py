@@ -0,0 +1,397 @@
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from prompt_cache import PromptCache, prompt_key
+
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")  # or paste api key here
+GROQ_API_URL = os.environ.get("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_MODEL = "gemma2-9b-it"
+
+# Cap on simultaneous upstream calls made by one process for batched work.
+MAX_CONCURRENCY = int(os.environ.get("EDUSYNC_LLM_CONCURRENCY", "8"))
+# Overall time limit (seconds) for a batch of calls, retries included.
+BATCH_TIMEOUT = float(os.environ.get("EDUSYNC_LLM_BATCH_TIMEOUT", "10"))
+# Connections kept alive to Groq. Under gevent workers every in-flight
+# request may hold one, so keep this near the worker's connection limit.
+POOL_SIZE = max(MAX_CONCURRENCY, int(os.environ.get("EDUSYNC_LLM_POOL_SIZE", "100")))
+
+CONNECT_TIMEOUT = float(os.environ.get("EDUSYNC_LLM_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.environ.get("EDUSYNC_LLM_READ_TIMEOUT", "30"))
+# Retries for 429/5xx and connection failures, with exponential backoff.
+MAX_RETRIES = int(os.environ.get("EDUSYNC_LLM_MAX_RETRIES", "2"))
+BACKOFF_BASE = float(os.environ.get("EDUSYNC_LLM_BACKOFF", "0.5"))
+BACKOFF_MAX = float(os.environ.get("EDUSYNC_LLM_BACKOFF_MAX", "8"))
+# Token bucket per process: sustained requests/second and burst size.
+# A rate of 0 disables local rate limiting.
+RATE_LIMIT = float(os.environ.get("EDUSYNC_LLM_RATE", "10"))
+RATE_BURST = int(os.environ.get("EDUSYNC_LLM_BURST", "20"))
+# Longest a call will wait for a rate-limit token before failing.
+RATE_WAIT = float(os.environ.get("EDUSYNC_LLM_RATE_WAIT", "5"))
+# Consecutive failures that open the circuit, and how long it stays open.
+BREAKER_THRESHOLD = int(os.environ.get("EDUSYNC_LLM_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("EDUSYNC_LLM_BREAKER_COOLDOWN", "30"))
+
+# Cache of successful responses for callers that opt in with cache=True.
+# A size or TTL of 0 disables it; a DB path adds an on-disk tier.
+PROMPT_CACHE_SIZE = int(os.environ.get("EDUSYNC_PROMPT_CACHE_SIZE", "1024"))
+PROMPT_CACHE_TTL = float(os.environ.get("EDUSYNC_PROMPT_CACHE_TTL", "3600"))
+PROMPT_CACHE_DB = os.environ.get("EDUSYNC_PROMPT_CACHE_DB", "")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+class LLMError(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait):
+        """Take a token, sleeping for one if needed. Returns False if that
+        would take longer than max_wait seconds."""
+        if self.rate <= 0:
+            return True
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures and rejects calls for
+    `cooldown` seconds, then lets a single trial call through."""
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def release(self):
+        """Give back a trial call that never reached upstream."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class LLMClient:
+    """Groq chat-completions client shared by the whole process: one pooled
+    session, connect/read timeouts, a token bucket, retries with backoff on
+    429/5xx, and a circuit breaker so an upstream outage fails fast."""
+
+    def __init__(self, api_key=GROQ_API_KEY, url=GROQ_API_URL, model=GROQ_MODEL):
+        self.api_key = api_key
+        self.url = url
+        self.model = model
+        self.bucket = TokenBucket(RATE_LIMIT, RATE_BURST)
+        self.breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def _payload(self, user_input, stream=False, system=None, history=()):
+        """history is earlier turns of the conversation, as chat messages."""
+        data = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system or SYSTEM_PROMPT},
+                *history,
+                {"role": "user", "content": user_input}
+            ]
+        }
+        if stream:
+            data["stream"] = True
+        return data
+
+    def _backoff(self, attempt, response=None, deadline=None):
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                delay = min(BACKOFF_MAX, float(response.headers["Retry-After"]))
+            except ValueError:
+                pass
+        delay *= random.uniform(0.8, 1.2)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def post(self, data, timeout=None, stream=False, deadline=None):
+        """POST to Groq, returning a successful response or raising LLMError.
+        With a deadline (a time.monotonic() value) no attempt, backoff or
+        rate-limit wait runs past it."""
+        if not self.api_key:
+            raise LLMError("API key not configured.")
+        if not self.breaker.allow():
+            raise LLMError("Groq API is unavailable right now; please try again shortly.")
+
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        read_timeout = READ_TIMEOUT if timeout is None else timeout
+        response = None
+        error = None
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt and not self._backoff(attempt - 1, response, deadline):
+                break
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if not self.bucket.acquire(RATE_WAIT if remaining is None else min(RATE_WAIT, remaining)):
+                self.breaker.release()
+                raise LLMError("Too many requests to Groq API; please try again shortly.")
+            if remaining is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    error = error or "Error calling Groq API: request timed out"
+                    break
+            try:
+                response = self.session.post(
+                    self.url, headers=headers, json=data,
+                    timeout=(CONNECT_TIMEOUT if remaining is None else min(CONNECT_TIMEOUT, remaining),
+                             read_timeout if remaining is None else min(read_timeout, remaining)),
+                    stream=stream
+                )
+            except requests.Timeout:
+                # Not retried: the time budget for this call is already spent.
+                error = "Error calling Groq API: request timed out"
+                break
+            except requests.RequestException as e:
+                response = None
+                error = f"Error calling Groq API: {e}"
+                continue
+            if response.ok:
+                # A streamed body can still fail; stream() records the outcome
+                if not stream:
+                    self.breaker.record_success()
+                return response
+            error = f"Error calling Groq API: {response.status_code}, {response.text}"
+            if response.status_code not in RETRY_STATUSES:
+                # A problem with our request; upstream itself is healthy.
+                self.breaker.record_success()
+                raise LLMError(error)
+
+        self.breaker.record_failure()
+        raise LLMError(error)
+
+    def complete(self, user_input, timeout=None, system=None, history=(), deadline=None):
+        try:
+            response = self.post(
+                self._payload(user_input, system=system, history=history), timeout=timeout, deadline=deadline
+            )
+            json_response = response.json()
+        except LLMError as e:
+            return {"response": str(e), "error": True}
+        except ValueError:
+            return {"response": "Invalid response received from Groq API.", "error": True}
+        metrics.record_tokens(json_response.get("usage"))
+        if "choices" in json_response and len(json_response["choices"]) > 0:
+            return {"response": json_response["choices"][0]["message"]["content"]}
+        else:
+            return {"response": "No response received from Groq API.", "error": True}
+
+    def stream(self, user_input, timeout=None, system=None, history=()):
+        payload = self._payload(user_input, stream=True, system=system, history=history)
+        response = self.post(payload, timeout=timeout, stream=True)
+        with response:
+            try:
+                yield from self._stream_content(response)
+            except requests.RequestException as e:
+                # A read timeout or reset mid-stream counts against the
+                # breaker like a failed request
+                self.breaker.record_failure()
+                raise LLMError(f"Error calling Groq API: {e}")
+            except BaseException:
+                # Including the caller abandoning the stream: upstream answered
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+
+    def _stream_content(self, response):
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            payload = line[len("data:"):].strip()
+            if payload == "[DONE]":
+                break
+            try:
+                chunk = json.loads(payload)
+            except ValueError:
+                continue
+            # Groq reports usage on the last chunk, under x_groq
+            metrics.record_tokens(chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage"))
+            for choice in chunk.get("choices", []):
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    yield content
+
+
+client = LLMClient()
+prompt_cache = PromptCache(PROMPT_CACHE_SIZE, PROMPT_CACHE_TTL, PROMPT_CACHE_DB or None)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="llm")
+    return _executor
+
+
+def _cache_key(user_input, system=None, history=()):
+    return prompt_key(client.model, client._payload(user_input, system=system, history=history)["messages"])
+
+
+def get_groq_response(user_input, language="english", timeout=None, cache=False, system=None, history=(),
+                      deadline=None):
+    """{"response": text} on success, {"response": message, "error": True}
+    on failure. system replaces the default system prompt and history is
+    earlier turns as chat messages. With cache=True an equivalent prompt
+    answered within the cache TTL is served without calling Groq. Retries
+    stop at deadline (a time.monotonic() value)."""
+    if not (cache and prompt_cache.enabled):
+        with metrics.span("llm"):
+            return client.complete(user_input, timeout=timeout, system=system, history=history, deadline=deadline)
+    key = _cache_key(user_input, system, history)
+    cached = prompt_cache.get(key)
+    if cached is not None:
+        return {"response": cached, "cached": True}
+    with metrics.span("llm"):
+        result = client.complete(user_input, timeout=timeout, system=system, history=history, deadline=deadline)
+    if not result.get("error"):
+        prompt_cache.set(key, result["response"])
+    return result
+
+
+def stream_groq_response(user_input, timeout=None, cache=False, system=None, history=()):
+    """Yield the completion for user_input piece by piece as Groq streams it.
+    With cache=True a cached answer is yielded whole, and a fully streamed
+    one is cached.
+
+    Raises LLMError (on the first iteration) if the call cannot be made.
+    """
+    if not (cache and prompt_cache.enabled):
+        return _timed_stream(client.stream(user_input, timeout=timeout, system=system, history=history))
+    return _stream_cached(user_input, timeout, system, history)
+
+
+def _timed_stream(parts):
+    with metrics.span("llm"):
+        yield from parts
+
+
+def _stream_cached(user_input, timeout, system=None, history=()):
+    key = _cache_key(user_input, system, history)
+    cached = prompt_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    for part in _timed_stream(client.stream(user_input, timeout=timeout, system=system, history=history)):
+        parts.append(part)
+        yield part
+    if parts:
+        prompt_cache.set(key, "".join(parts))
+
+
+def get_groq_responses(prompts, timeout=None, cache=False):
+    """Run several prompts concurrently, returning responses in prompt order.
+
+    At most MAX_CONCURRENCY calls are in flight across the whole process.
+    The whole batch, retries and waiting for a free slot included, takes at
+    most `timeout` seconds; a call that fails or is not done by then yields
+    None instead of failing the batch.
+    """
+    timeout = BATCH_TIMEOUT if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    executor = _get_executor()
+    with metrics.span("llm"):
+        # Each call runs in a copy of the caller's context so its token
+        # usage is counted against the calling request.
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run, get_groq_response, prompt,
+                timeout=timeout, cache=cache, deadline=deadline
+            )
+            for prompt in prompts
+        ]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except Exception:
+                future.cancel()
+                results.append(None)
+    return results
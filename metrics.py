@@ -0,0 +1,241 @@
+import bisect
+import contextvars
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_request = contextvars.ContextVar("edusync_request", default=None)
+_active_spans = contextvars.ContextVar("edusync_active_spans", default=frozenset())
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(label, "") for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(label, "") for label in self.labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _labels(self.labels + ("le",), key + (f"{bound:g}",))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + ('+Inf',))} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+
+request_duration = Histogram(
+    "edusync_request_duration_seconds", "Time spent handling a request.", ("route", "method", "status")
+)
+span_duration = Histogram(
+    "edusync_span_duration_seconds", "Time spent in storage, catalog and LLM calls per route.", ("route", "span")
+)
+llm_tokens = Counter("edusync_llm_tokens_total", "Tokens reported by Groq.", ("route", "type"))
+
+
+class RequestTimings:
+    """Span totals and LLM token usage for one request."""
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.tokens = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name, seconds):
+        with self._lock:
+            total, count = self.spans.get(name, (0.0, 0))
+            self.spans[name] = (total + seconds, count + 1)
+
+    def add_tokens(self, usage):
+        with self._lock:
+            for kind, count in usage.items():
+                self.tokens[kind] = self.tokens.get(kind, 0) + count
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Value for a Server-Timing response header."""
+        with self._lock:
+            parts = [
+                f'{name};dur={total * 1000:.1f};desc="{count} calls"'
+                for name, (total, count) in sorted(self.spans.items())
+            ]
+            if self.tokens:
+                usage = " ".join(f"{kind}={count}" for kind, count in sorted(self.tokens.items()))
+                parts.append(f'tokens;desc="{usage}"')
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def start_request(route):
+    timings = RequestTimings(route)
+    _request.set(timings)
+    return timings
+
+
+def current_request():
+    return _request.get()
+
+
+def finish_request(timings, method, status):
+    if _request.get() is timings:
+        _request.set(None)
+    request_duration.observe(timings.elapsed(), route=timings.route, method=method, status=str(status))
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block as `name` for the current request. A span
+    nested in one of the same name (e.g. a batch of LLM calls and the calls
+    inside it) is only counted once."""
+    active = _active_spans.get()
+    if name in active:
+        yield
+        return
+    _active_spans.set(active | {name})
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _active_spans.set(active)
+        _record_span(name, time.perf_counter() - started, _request.get())
+
+
+def _record_span(name, elapsed, timings):
+    route = timings.route if timings is not None else ""
+    span_duration.observe(elapsed, route=route, span=name)
+    if timings is not None:
+        timings.add_span(name, elapsed)
+
+
+def timed_iter(name, iterator):
+    """Yield from iterator, counting the time spent producing its items as
+    one `name` span of the request it was created in, recorded when it is
+    exhausted or closed."""
+    timings = _request.get()
+    elapsed = 0.0
+    try:
+        while True:
+            nested = name in _active_spans.get()
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                if not nested:
+                    elapsed += time.perf_counter() - started
+            yield item
+    finally:
+        _record_span(name, elapsed, timings)
+
+
+def record_tokens(usage):
+    """Count a Groq `usage` object against the current request."""
+    if not isinstance(usage, dict):
+        return
+    counts = {
+        kind: int(usage[f"{kind}_tokens"])
+        for kind in ("prompt", "completion", "total")
+        if isinstance(usage.get(f"{kind}_tokens"), (int, float))
+    }
+    timings = _request.get()
+    route = timings.route if timings is not None else ""
+    for kind, count in counts.items():
+        llm_tokens.inc(count, route=route, type=kind)
+    if timings is not None:
+        timings.add_tokens(counts)
+
+
+class Instrumented:
+    """Proxy that times every method call on `target` as a `name` span. A
+    generator method is timed while it is iterated, not when it is called."""
+
+    def __init__(self, target, name):
+        self._target = target
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if not callable(value):
+            return value
+        if inspect.isgeneratorfunction(value):
+            return lambda *args, **kwargs: timed_iter(self._name, value(*args, **kwargs))
+
+        def timed(*args, **kwargs):
+            with span(self._name):
+                return value(*args, **kwargs)
+        return timed
+
+
+def gauge(name, help_text, samples, labels=()):
+    """Prometheus lines for a gauge from [(label values, value)]."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    lines.extend(f"{name}{_labels(labels, key)} {value}" for key, value in samples)
+    return lines
+
+
+def render(extra=()):
+    lines = []
+    for metric in (request_duration, span_duration, llm_tokens):
+        lines.extend(metric.render())
+    for extra_lines in extra:
+        lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,314 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Letter grades on the 10-point scale used by the FYUGP regulations
+LETTER_GRADES = {
+    "O": 10, "A+": 9, "A": 8, "B+": 7, "B": 6, "C": 5, "P": 4, "F": 0
+}
+DEFAULT_GRADE = 70.0
+# Grade change (percentage points) from the easiest to the hardest course in
+# the catalog, used until there is enough history to fit one.
+DEFAULT_HARDNESS_SLOPE = -10.0
+MAX_HARDNESS_SLOPE = 30.0
+# Percentage points gained per point of attendance above a student's usual
+DEFAULT_ATTENDANCE_SLOPE = 0.2
+MAX_ATTENDANCE_SLOPE = 1.0
+MIN_FIT_ROWS = 10
+# Weight of a result per semester of age, so recent semesters count more
+RECENCY_DECAY = 0.8
+
+PREDICTION_COLUMNS = ['username', 'course_code', 'predicted_grade', 'required_grade']
+
+
+def normalize_grades(values):
+    """Grades as percentages (0-100). Accepts 10-point grades ("9.6"),
+    percentages ("85" or "85%") and letter grades ("B+"); anything else
+    becomes NaN."""
+    import pandas as pd
+    text = pd.Series(values, dtype="object").astype(str).str.strip().str.upper()
+    numeric = pd.to_numeric(text.str.rstrip("%"), errors="coerce")
+    percent = text.str.endswith("%")
+    grades = numeric.where(percent | (numeric > 10), numeric * 10)
+    letters = text.map(LETTER_GRADES) * 10
+    grades = grades.fillna(letters)
+    return grades.where((grades >= 0) & (grades <= 100)).to_numpy(dtype=float)
+
+
+def _float(value, default=np.nan):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def normalize_grade(value):
+    """normalize_grades() for a single value."""
+    text = str(value).strip().upper()
+    number = _float(text.rstrip("%"))
+    if number != number:
+        number = LETTER_GRADES.get(text, np.nan) * 10
+    elif not text.endswith("%") and number <= 10:
+        number *= 10
+    return number if 0 <= number <= 100 else np.nan
+
+
+def _in_background(target):
+    """Run target on a native thread. Under gevent a plain thread is a
+    greenlet, and pandas work on it would hold up every other request on
+    the worker until it finished, so gevent's native thread pool is used."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        monkey = None
+    if monkey is not None and monkey.is_module_patched('threading'):
+        import gevent
+        gevent.get_hub().threadpool.spawn(target)
+    else:
+        threading.Thread(target=target, name="grade-refit", daemon=True).start()
+
+
+class GradePredictor:
+    """Predicts course grades from past results.
+
+    A student's baseline is their credit- and recency-weighted mean grade;
+    each course then moves that up or down by how hard it is compared to
+    the courses behind the baseline, and by any expected change in
+    attendance. Both effects are fitted across the whole cohort by least
+    squares on within-student deviations, so a strong student's record is
+    not mistaken for easy courses.
+    """
+
+    def __init__(self, catalog, refit_interval=300):
+        self.catalog = catalog
+        self.refit_interval = refit_interval
+        self.hardness_slope = DEFAULT_HARDNESS_SLOPE
+        self.attendance_slope = DEFAULT_ATTENDANCE_SLOPE
+        self.cohort_mean = DEFAULT_GRADE
+        self.fitted_at = None
+        self._courses = None
+        self._course_values = None
+        self._mean_hardness = np.nan
+        self._lock = threading.Lock()
+        self._refitting = False
+
+    def _load_courses(self):
+        codes, rows = self.catalog.first_rows()
+        credits = np.nan_to_num(self.catalog.column('Credits')[rows].astype(float))
+        hardness = self.catalog.column('Hardness')[rows].astype(float)
+        max_hardness = np.nanmax(hardness) if not np.isnan(hardness).all() else np.nan
+        hardness = np.nan_to_num(hardness / max_hardness if max_hardness else hardness * 0)
+        self._mean_hardness = float(hardness.mean()) if len(hardness) else np.nan
+        self._course_values = dict(zip(codes, zip(credits.tolist(), hardness.tolist())))
+
+    @property
+    def course_values(self):
+        """{course code: (credits, hardness scaled to 0-1)}, read straight
+        from the catalog's arrays so the single-student path needs no
+        pandas."""
+        if self._course_values is None:
+            self._load_courses()
+        return self._course_values
+
+    @property
+    def mean_hardness(self):
+        if self._course_values is None:
+            self._load_courses()
+        return self._mean_hardness
+
+    @property
+    def courses(self):
+        """course_values as a DataFrame indexed by course code."""
+        if self._courses is None:
+            import pandas as pd
+            self._courses = pd.DataFrame.from_dict(
+                self.course_values, orient='index', columns=['credits', 'hardness']
+            )
+        return self._courses
+
+    def frame(self, history_rows):
+        """History rows joined with catalog credits and hardness, with
+        unreadable grades dropped."""
+        import pandas as pd
+        df = pd.DataFrame(list(history_rows), columns=['username', 'subject_code', 'grade', 'attendance', 'semester'])
+        df['grade'] = normalize_grades(df['grade'])
+        df['attendance'] = pd.to_numeric(df['attendance'], errors='coerce')
+        df['semester'] = pd.to_numeric(df['semester'], errors='coerce').fillna(0)
+        df = df.join(self.courses, on='subject_code')
+        df['credits'] = df['credits'].fillna(0.0).where(lambda c: c > 0, 1.0)
+        df['hardness'] = df['hardness'].fillna(self.mean_hardness)
+        return df.dropna(subset=['grade'])
+
+    def fit(self, history_rows):
+        """Fit the slopes and cohort mean to history_rows. The new values are
+        swapped in together once fitting is done, so predictions made
+        meanwhile use the previous model."""
+        df = self.frame(history_rows)
+        hardness_slope, attendance_slope, cohort_mean = self.hardness_slope, self.attendance_slope, self.cohort_mean
+        if len(df) >= MIN_FIT_ROWS:
+            by_student = df.groupby('username')
+            grade_dev = df['grade'] - by_student['grade'].transform('mean')
+            hardness_dev = df['hardness'] - by_student['hardness'].transform('mean')
+            attendance_dev = (df['attendance'] - by_student['attendance'].transform('mean')).fillna(0.0)
+            features = np.column_stack([hardness_dev, attendance_dev])
+            spread = (features ** 2).sum(axis=0) > 1e-9
+            if spread.any():
+                coef = np.zeros(2)
+                coef[spread] = np.linalg.lstsq(features[:, spread], grade_dev.to_numpy(), rcond=None)[0]
+                if spread[0]:
+                    hardness_slope = float(np.clip(coef[0], -MAX_HARDNESS_SLOPE, 0.0))
+                if spread[1]:
+                    attendance_slope = float(np.clip(coef[1], 0.0, MAX_ATTENDANCE_SLOPE))
+        if len(df):
+            cohort_mean = float(df['grade'].mean())
+        self.hardness_slope, self.attendance_slope, self.cohort_mean = hardness_slope, attendance_slope, cohort_mean
+        self.fitted_at = time.monotonic()
+        return self
+
+    def refresh(self, load_history):
+        """Start a refit from load_history() in the background if the model
+        is older than refit_interval seconds, and return right away; the
+        current model (the defaults before the first fit) is used until the
+        refit finishes."""
+        with self._lock:
+            if self._refitting:
+                return self
+            if self.fitted_at is not None and time.monotonic() - self.fitted_at < self.refit_interval:
+                return self
+            self._refitting = True
+        _in_background(lambda: self._refit(load_history))
+        return self
+
+    def _refit(self, load_history):
+        try:
+            self.fit(load_history())
+        except Exception:
+            logger.exception("Refitting the grade model failed")
+            # Wait a full interval before trying again
+            self.fitted_at = time.monotonic()
+        finally:
+            self._refitting = False
+
+    def baselines(self, df):
+        """Per-student baseline grade, hardness and attendance."""
+        import pandas as pd
+        if df.empty:
+            return pd.DataFrame(columns=['baseline', 'base_hardness', 'attendance'], dtype=float)
+        age = df.groupby('username')['semester'].transform('max') - df['semester']
+        weight = df['credits'] * RECENCY_DECAY ** age
+        weighted = df.assign(
+            weight=weight, grade_w=df['grade'] * weight, hardness_w=df['hardness'] * weight
+        ).groupby('username')
+        totals = weighted[['weight', 'grade_w', 'hardness_w']].sum()
+        return pd.DataFrame({
+            'baseline': totals['grade_w'] / totals['weight'],
+            'base_hardness': totals['hardness_w'] / totals['weight'],
+            'attendance': weighted['attendance'].mean(),
+        })
+
+    def _grades(self, baseline, base_hardness, hardness, attendance_change):
+        return np.clip(
+            baseline
+            + self.hardness_slope * (hardness - base_hardness)
+            + self.attendance_slope * attendance_change,
+            0, 100
+        ).round(1)
+
+    def predict(self, history_rows, plan, targets=None, attendance=None):
+        """Predict every (username, course_code) pair in plan in one pass.
+
+        targets maps usernames to a target semester average (percent); the
+        required grade per course is that student's prediction shifted so
+        the credit-weighted average of the semester meets the target.
+        attendance maps usernames to an expected attendance (percent); by
+        default each student keeps their past average.
+        Returns a DataFrame with PREDICTION_COLUMNS plus course credits.
+        """
+        import pandas as pd
+        plan = pd.DataFrame(list(plan), columns=['username', 'course_code'])
+        profile = self.baselines(self.frame(history_rows))
+        df = plan.join(self.courses, on='course_code').join(profile, on='username')
+        df['credits'] = df['credits'].fillna(0.0)
+        df['hardness'] = df['hardness'].fillna(self.mean_hardness)
+        df['baseline'] = df['baseline'].fillna(self.cohort_mean)
+        df['base_hardness'] = df['base_hardness'].fillna(self.mean_hardness)
+        expected_attendance = df['username'].map(attendance or {}).astype(float)
+        attendance_change = (expected_attendance - df['attendance']).fillna(0.0)
+        df['predicted_grade'] = self._grades(
+            df['baseline'], df['base_hardness'], df['hardness'], attendance_change
+        )
+
+        target = df['username'].map(targets or {}).astype(float)
+        weight = df['credits'].where(df['credits'] > 0, 1.0)
+        semester_average = (
+            (df['predicted_grade'] * weight).groupby(df['username']).transform('sum')
+            / weight.groupby(df['username']).transform('sum')
+        )
+        df['required_grade'] = np.clip(df['predicted_grade'] + target - semester_average, 0, 100).round(1)
+        return df[PREDICTION_COLUMNS + ['credits']]
+
+    def predict_student(self, username, history_rows, course_codes, target_grade=None, attendance=None):
+        """predict() for one student, returned as a list of dicts. Works on
+        plain NumPy arrays: for a single student pandas' per-call overhead
+        costs more than the arithmetic."""
+        values = self.course_values
+        mean_hardness = float(self.mean_hardness)
+        rows = []
+        for row in history_rows:
+            grade = normalize_grade(row.get('grade'))
+            if grade == grade:
+                credits, hardness = values.get(row.get('subject_code'), (0.0, mean_hardness))
+                rows.append((grade, _float(row.get('attendance')), _float(row.get('semester'), 0.0),
+                             credits if credits > 0 else 1.0, hardness))
+
+        baseline, base_hardness, past_attendance = self.cohort_mean, mean_hardness, np.nan
+        if rows:
+            grade, attended, semester, credits, hardness = np.array(rows, dtype=float).T
+            weight = credits * RECENCY_DECAY ** (semester.max() - semester)
+            baseline = float(weight @ grade / weight.sum())
+            base_hardness = float(weight @ hardness / weight.sum())
+            if not np.isnan(attended).all():
+                past_attendance = float(np.nanmean(attended))
+
+        course_codes = list(course_codes)
+        credits, hardness = (np.array(column, dtype=float) for column in zip(
+            *(values.get(code, (0.0, mean_hardness)) for code in course_codes)
+        )) if course_codes else (np.zeros(0), np.zeros(0))
+        change = 0.0
+        if attendance is not None and past_attendance == past_attendance:
+            change = attendance - past_attendance
+        predicted = self._grades(baseline, base_hardness, hardness, change)
+
+        required = [None] * len(course_codes)
+        if target_grade is not None and course_codes:
+            weight = np.where(credits > 0, credits, 1.0)
+            average = float(weight @ predicted / weight.sum())
+            required = np.clip(predicted + target_grade - average, 0, 100).round(1).tolist()
+
+        return [
+            {
+                "course_code": code,
+                "credits": int(course_credits),
+                "predicted_grade": grade,
+                "required_grade": required_grade,
+            }
+            for code, course_credits, grade, required_grade in zip(
+                course_codes, credits.tolist(), predicted.tolist(), required
+            )
+        ]
+
+def format_predictions(predictions):
+    """Render predictions as the fixed-width table the dashboard shows."""
+    border = "+-------------+------------------+------------------+\n"
+
+    def cell(value):
+        return "-" if value is None else f"{value:g}%"
+
+    table = border + "| Course Code | Predicted Grade  | Required Grade   |\n" + border
+    for p in predictions:
+        table += f"|{p['course_code']:^13}|{cell(p['predicted_grade']):^18}|{cell(p['required_grade']):^18}|\n"
+    return table + border
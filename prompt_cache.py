@@ -0,0 +1,99 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from storage import SidecarDB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prompt_cache (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS prompt_cache_expires ON prompt_cache (expires_at);
+"""
+
+
+def normalize(text):
+    """Fold differences that do not change a prompt's meaning: Unicode
+    compatibility forms, case and runs of whitespace."""
+    return " ".join(unicodedata.normalize("NFKC", str(text)).casefold().split())
+
+
+def prompt_key(model, messages):
+    normalized = [{"role": m["role"], "content": normalize(m["content"])} for m in messages]
+    payload = json.dumps({"model": model, "messages": normalized}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """LLM responses keyed by prompt_key(), held in a size-bounded LRU with a
+    TTL and optionally persisted to SQLite so they survive restarts."""
+
+    def __init__(self, size=1024, ttl=3600, path=None):
+        self.size = size
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = SidecarDB(path, SCHEMA) if path else None
+
+    @property
+    def enabled(self):
+        return self.size > 0 and self.ttl > 0
+
+    def _remember(self, key, response, expires_at):
+        self._lru[key] = (response, expires_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.size:
+            self._lru.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            cached = self._lru.get(key)
+            if cached is not None:
+                if cached[1] > now:
+                    self._lru.move_to_end(key)
+                    self.hits += 1
+                    return cached[0]
+                del self._lru[key]
+            if self._db is not None:
+                row = self._db.connection().execute(
+                    "SELECT response, expires_at FROM prompt_cache WHERE key = ? AND expires_at > ?",
+                    (key, now)
+                ).fetchone()
+                if row is not None:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def set(self, key, response):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, response, expires_at)
+            if self._db is not None:
+                conn = self._db.connection()
+                try:
+                    with conn:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO prompt_cache (key, response, expires_at) VALUES (?, ?, ?)",
+                            (key, response, expires_at)
+                        )
+                        conn.execute("DELETE FROM prompt_cache WHERE expires_at <= ?", (time.time(),))
+                except sqlite3.OperationalError:
+                    # Another process held the file past the busy timeout;
+                    # the answer stays cached in memory.
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._lru)}
@@ -0,0 +1,172 @@
+import os
+import random
+import re
+import threading
+import time
+
+from llm import get_groq_response, get_groq_responses
+from storage import SidecarDB
+
+# Pre-generated psych evaluation questions, filled by `flask warm-questions`
+# or on demand.
+BANK_PATH = os.environ.get("EDUSYNC_QUESTION_DB", "psych_questions.db")
+QUESTIONS_PER_KEY = int(os.environ.get("EDUSYNC_QUESTIONS_PER_KEY", "3"))
+# Seconds between reloads of the bank from disk, picking up questions
+# generated by other workers or an offline warm run; 0 disables.
+REFRESH_INTERVAL = float(os.environ.get("EDUSYNC_QUESTION_REFRESH", "0"))
+WARM_BATCH_SIZE = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS psych_questions (
+    criterion TEXT NOT NULL,
+    discipline TEXT NOT NULL,
+    band TEXT NOT NULL,
+    question TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (criterion, discipline, band, question)
+);
+"""
+
+_NUMBERING_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def semester_band(semester):
+    """Year of study as a band of two semesters ("1-2", "3-4", ...)."""
+    try:
+        semester = int(semester)
+    except (TypeError, ValueError):
+        return "any"
+    if semester < 1:
+        return "any"
+    first = semester - (semester + 1) % 2
+    return f"{first}-{first + 1}"
+
+
+def bank_key(criterion, discipline, semester):
+    return (criterion, " ".join(str(discipline or "").lower().split()), semester_band(semester))
+
+
+def question_prompt(criterion, discipline, band, count=QUESTIONS_PER_KEY):
+    year = "" if band == "any" else f" in semesters {band}"
+    return (
+        f"Generate {count} different questions to evaluate a university student's {criterion}. "
+        f"The student is studying {discipline or 'an undergraduate programme'}{year}. "
+        f"Each question should be short and specific to their background and relevant to {criterion} and musn't be too much focused on their discipline as this is a question for psychological evaluation. "
+        "Return one question per line with no numbering, explanation or context."
+    )
+
+
+def parse_questions(api_response):
+    if not api_response or api_response.get("error"):
+        return []
+    lines = [_NUMBERING_RE.sub("", line).strip() for line in api_response.get("response", "").splitlines()]
+    lines = [line for line in lines if line]
+    return [line for line in lines if line.endswith("?")] or [line for line in lines if not line.endswith(":")]
+
+
+class QuestionBank:
+    """Questions keyed by (criterion, discipline, semester band), held in
+    memory and persisted to SQLite."""
+
+    def __init__(self, path=BANK_PATH):
+        self.path = path
+        self._questions = None
+        self._lock = threading.Lock()
+        self._db = SidecarDB(path, SCHEMA)
+        self._refresher = None
+
+    def load(self):
+        questions = {}
+        with self._lock:
+            rows = self._db.connection().execute(
+                "SELECT criterion, discipline, band, question FROM psych_questions"
+            ).fetchall()
+            for criterion, discipline, band, question in rows:
+                questions.setdefault((criterion, discipline, band), []).append(question)
+            self._questions = questions
+        return questions
+
+    def questions(self, key):
+        if self._questions is None:
+            self.load()
+        return self._questions.get(key, [])
+
+    def get(self, key):
+        """A random question for key, or None if the bank has none."""
+        questions = self.questions(key)
+        return random.choice(questions) if questions else None
+
+    def add_many(self, key, questions):
+        if not questions:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._db.connection()
+            conn.executemany(
+                "INSERT OR IGNORE INTO psych_questions (criterion, discipline, band, question, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [key + (question, now) for question in questions]
+            )
+            conn.commit()
+            if self._questions is not None:
+                known = self._questions.setdefault(key, [])
+                known.extend(q for q in questions if q not in known)
+
+    def start_refresh(self, interval=REFRESH_INTERVAL):
+        """Reload the bank from disk every `interval` seconds in a daemon
+        thread."""
+        if interval <= 0 or self._refresher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.load()
+
+        self._refresher = threading.Thread(target=run, name="question-bank-refresh", daemon=True)
+        self._refresher.start()
+
+
+bank = QuestionBank()
+
+
+def get_question(criterion, discipline, semester):
+    """{"response": question} from the bank, falling back to one LLM call
+    (whose questions are added to the bank) on a miss. On failure returns
+    {"response": message, "error": True}."""
+    key = bank_key(criterion, discipline, semester)
+    question = bank.get(key)
+    if question is not None:
+        return {"response": question}
+    api_response = get_groq_response(question_prompt(criterion, discipline, key[2]))
+    if api_response.get("error"):
+        return api_response
+    questions = parse_questions(api_response)
+    if not questions:
+        return {"response": api_response.get("response", "").strip() or "No question available."}
+    bank.add_many(key, questions)
+    return {"response": random.choice(questions)}
+
+
+def warm(criteria, disciplines, semesters, batch_size=WARM_BATCH_SIZE, log=print):
+    """Generate questions for every (criterion, discipline, band) the bank
+    has none for. Returns the number of keys filled."""
+    bands = sorted({semester_band(semester) for semester in semesters})
+    keys = {
+        bank_key(criterion, discipline, band.split("-")[0])
+        for criterion in criteria for discipline in disciplines for band in bands
+    }
+    pending = sorted(key for key in keys if not bank.questions(key))
+    log(f"{len(pending)} question sets to generate.")
+
+    filled = 0
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        responses = get_groq_responses([question_prompt(*key) for key in batch])
+        for key, api_response in zip(batch, responses):
+            questions = parse_questions(api_response)
+            if questions:
+                bank.add_many(key, questions)
+                filled += 1
+        log(f"{min(start + batch_size, len(pending))}/{len(pending)} processed, {filled} filled.")
+    return filled
@@ -0,0 +1,129 @@
+from catalog import tokenize
+
+MIN_CREDITS = 20
+MAX_CREDITS = 30
+
+# Words too common in course titles and career goals to signal a match
+STOPWORDS = {
+    "a", "an", "and", "as", "at", "for", "i", "ii", "iii", "in", "into", "iv",
+    "of", "on", "or", "part", "the", "to", "with", "fyugp"
+}
+KEYWORD_BONUS = 0.15
+MAX_KEYWORD_BONUS = 0.45
+HARDNESS_PENALTY = 0.1
+
+
+def _keywords(text):
+    return {token for token in tokenize(text) if token not in STOPWORDS and len(token) > 2}
+
+
+def _number(value, default=0.0):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return default if number != number else number  # NaN
+
+
+def is_mandatory(course):
+    return _number(course.get('Mandatory')) == 1.0
+
+
+def score_course(course, goal_keywords, max_hardness, hardness_weight=HARDNESS_PENALTY):
+    """Higher is better: the catalog weightage, plus a bonus per career-goal
+    keyword found in the title, minus a penalty for relative hardness."""
+    matched = sorted(goal_keywords & _keywords(course.get('Course Title', '')))
+    bonus = min(MAX_KEYWORD_BONUS, KEYWORD_BONUS * len(matched))
+    hardness = _number(course.get('Hardness'))
+    penalty = hardness_weight * (hardness / max_hardness if max_hardness else 0)
+    return _number(course.get('Weightage')) + bonus - penalty, matched
+
+
+def _reason(course, matched, career_goal):
+    if is_mandatory(course):
+        return "Mandatory for this semester"
+    if matched:
+        return f"Builds skills in {', '.join(matched)} for your goal of {career_goal}"
+    weightage = _number(course.get('Weightage'))
+    if weightage >= 0.5:
+        return "Core course with high weightage"
+    if weightage >= 0.2:
+        return "Strengthens your discipline electives"
+    return f"Completes your credit requirement ({course.get('Category', 'elective')})"
+
+
+def recommend(courses, career_goal="", predicted_grade=None,
+              min_credits=MIN_CREDITS, max_credits=MAX_CREDITS):
+    """Pick courses for a semester.
+
+    Every mandatory course is taken. The optional courses are chosen with a
+    0/1 knapsack over credits that maximises total score while keeping the
+    semester total between min_credits and max_credits (or as close to
+    min_credits as the catalog allows). Deterministic for a given input.
+    """
+    goal_keywords = _keywords(career_goal)
+    max_hardness = max((_number(c.get('Hardness')) for c in courses), default=0)
+    hardness_weight = HARDNESS_PENALTY
+    if predicted_grade is not None:
+        # Weaker predicted results weigh hardness more heavily, up to 2x
+        hardness_weight *= 1 + max(0.0, min(1.0, (70 - _number(predicted_grade, 70)) / 30))
+
+    mandatory, optional = [], []
+    for course in courses:
+        score, matched = score_course(course, goal_keywords, max_hardness, hardness_weight)
+        entry = {
+            "course": course,
+            "credits": int(_number(course.get('Credits'))),
+            "score": score,
+            "reason": _reason(course, matched, career_goal),
+        }
+        (mandatory if is_mandatory(course) else optional).append(entry)
+
+    mandatory_credits = sum(e["credits"] for e in mandatory)
+    budget = max(0, max_credits - mandatory_credits)
+
+    # best[c] = (score, chosen indexes) using exactly c optional credits
+    best = {0: (0.0, ())}
+    for i, entry in enumerate(optional):
+        credits = entry["credits"]
+        for total, (score, chosen) in sorted(best.items(), reverse=True):
+            new_total = total + credits
+            if new_total > budget:
+                continue
+            candidate = (score + entry["score"], chosen + (i,))
+            if new_total not in best or candidate[0] > best[new_total][0]:
+                best[new_total] = candidate
+
+    needed = max(0, min_credits - mandatory_credits)
+    feasible = [total for total in best if total >= needed]
+    if feasible:
+        chosen_total = max(feasible, key=lambda total: (best[total][0], total))
+    else:
+        chosen_total = max(best)
+    chosen = [optional[i] for i in best[chosen_total][1]]
+    chosen.sort(key=lambda e: -e["score"])
+
+    return {
+        "mandatory": mandatory,
+        "optional": chosen,
+        "total_credits": mandatory_credits + chosen_total,
+    }
+
+
+def format_recommendation(selection):
+    """Render a selection in the MANDATORY/OPTIONAL line format the
+    dashboard shows."""
+    def lines(entries):
+        return "".join(
+            f"{e['course']['Course Code']} | {e['course']['Course Title']} | {e['reason']} $\n"
+            for e in entries
+        )
+    return (
+        "MANDATORY COURSES: $\n"
+        f"{lines(selection['mandatory'])}"
+        "\n"
+        "OPTIONAL COURSES: $\n"
+        f"{lines(selection['optional'])}"
+        "\n"
+        f"TOTAL CREDITS: {selection['total_credits']} $"
+    )
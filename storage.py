@@ -0,0 +1,802 @@
+import csv
+import io
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from journal import AppendJournal
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+USER_FIELDS = ['username', 'password', 'name', 'age', 'discipline', 'current_semester', 'career_goal']
+HISTORY_FIELDS = ['username', 'subject_code', 'grade', 'attendance', 'semester']
+RECOMMENDATION_FIELDS = ['username', 'semester', 'recommended_courses']
+SKILLCHART_FIELDS = ['username', 'skills', 'profile']
+
+STORAGE_BACKEND = os.environ.get("EDUSYNC_STORAGE", "csv")
+DATA_DIR = os.environ.get("EDUSYNC_DATA_DIR", ".")
+DB_PATH = os.environ.get("EDUSYNC_DB", os.path.join(DATA_DIR, "edusync.db"))
+# Seconds between write-behind flushes of history/recommendation appends;
+# 0 writes every append straight to disk.
+JOURNAL_INTERVAL = float(os.environ.get("EDUSYNC_JOURNAL_INTERVAL", "1.0"))
+# Rewrite recommendations.csv down to the latest row per (username, semester)
+# after this many appends.
+COMPACT_RECOMMENDATIONS_AFTER = int(os.environ.get("EDUSYNC_COMPACT_RECOMMENDATIONS_AFTER", "200"))
+# Seconds an SQLite call waits for another process's write to finish. Kept
+# short: callers wait holding a lock, and under gevent the whole worker waits.
+BUSY_TIMEOUT = float(os.environ.get("EDUSYNC_SQLITE_BUSY_TIMEOUT", "2"))
+# Connections each process keeps open to the SQLite storage backend
+POOL_SIZE = int(os.environ.get("EDUSYNC_SQLITE_POOL_SIZE", "4"))
+# Rows read per query while streaming a student's history from SQLite
+ITER_BATCH_SIZE = 500
+
+
+def psych_column(criterion):
+    return criterion.lower().replace(" ", "_")
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+def _semester_matches(value, semester):
+    try:
+        return int(value) == semester
+    except (TypeError, ValueError):
+        return False
+
+
+def _lines(binary_file, limit):
+    """Decoded lines from the first `limit` bytes of binary_file."""
+    consumed = 0
+    for line in binary_file:
+        if consumed >= limit:
+            break
+        line = line[:limit - consumed]
+        consumed += len(line)
+        yield line.decode('utf-8')
+
+
+def _latest_recommendations(rows):
+    """Keep only the most recent row per (username, semester), ordered by
+    when that row was written."""
+    latest = {}
+    for row in rows:
+        key = (row['username'], row['semester'])
+        latest.pop(key, None)
+        latest[key] = row
+    return list(latest.values())
+
+
+class UserExistsError(Exception):
+    pass
+
+
+class Storage:
+    """Interface shared by the storage backends. Records are plain dicts of
+    strings, as csv.DictReader would return them."""
+
+    def get_user(self, username):
+        raise NotImplementedError
+
+    def load_users(self):
+        raise NotImplementedError
+
+    def save_user(self, user_data):
+        raise NotImplementedError
+
+    def update_user(self, user_data):
+        raise NotImplementedError
+
+    def add_history(self, history_record):
+        raise NotImplementedError
+
+    def get_history(self, username):
+        raise NotImplementedError
+
+    def all_history(self):
+        raise NotImplementedError
+
+    def iter_history(self, username, semester=None, cursor=None):
+        """Yield (cursor, record) for a user's history in the order it was
+        added, optionally for one semester and only after a cursor taken
+        from an earlier record. Records are read lazily."""
+        raise NotImplementedError
+
+    def history_version(self, username):
+        """An opaque string that changes whenever the user's history does
+        (it may also change when it did not)."""
+        raise NotImplementedError
+
+    def history_page(self, username, semester=None, cursor=None, limit=None):
+        """Up to `limit` records after `cursor`, and the cursor to pass for
+        the next page (None on the last page)."""
+        records, last = [], None
+        for position, record in self.iter_history(username, semester, cursor):
+            if limit is not None and len(records) >= limit:
+                return records, last
+            records.append(record)
+            last = position
+        return records, None
+
+    def save_recommendation(self, rec):
+        raise NotImplementedError
+
+    def get_recommendation(self, username, semester):
+        raise NotImplementedError
+
+    def get_psych_eval(self, username):
+        raise NotImplementedError
+
+    def set_psych_scores(self, username, scores):
+        """Merge {criterion_column: score} into the user's psych evaluation."""
+        raise NotImplementedError
+
+    def psych_version(self, username):
+        """An opaque string that changes whenever the user's psych scores do
+        (it may also change when they did not)."""
+        raise NotImplementedError
+
+    def get_skill_chart(self, username):
+        """{"skills": <json>, "profile": <key it was generated for>} or None."""
+        raise NotImplementedError
+
+    def save_skill_chart(self, username, skills, profile=""):
+        raise NotImplementedError
+
+    def user_cache_stats(self):
+        return {}
+
+
+class UserCache:
+    """Process-wide copy of users.csv keyed by username. The file is only
+    re-parsed when its (inode, size, mtime) changes or after our own writes."""
+
+    def __init__(self, path, load):
+        self.path = path
+        self.load = load
+        self.hits = 0
+        self.misses = 0
+        self._users = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _current_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def users(self):
+        signature = self._current_signature()
+        with self._lock:
+            if self._users is not None and signature == self._signature:
+                self.hits += 1
+                return self._users
+            self.misses += 1
+            # The signature is taken before loading, so a change that lands
+            # mid-load only causes one extra reload later.
+            self._users = self.load()
+            self._signature = signature
+            return self._users
+
+    def invalidate(self):
+        with self._lock:
+            self._users = None
+            self._signature = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._users) if self._users is not None else 0,
+            }
+
+
+class RowCounts:
+    """Rows per username in an append-only CSV file, kept current by reading
+    only the complete lines appended since the last call. A file that was
+    replaced or truncated is counted again from the start."""
+
+    def __init__(self, path, file_lock):
+        self.path = path
+        self.file_lock = file_lock
+        self._counts = {}
+        self._inode = None
+        self._offset = 0
+        self._column = None
+        self._lock = threading.Lock()
+
+    def _catch_up(self):
+        with self.file_lock():
+            try:
+                f = open(self.path, 'rb')
+            except FileNotFoundError:
+                self._counts, self._inode, self._offset, self._column = {}, None, 0, None
+                return
+            with f:
+                st = os.fstat(f.fileno())
+                if st.st_ino != self._inode or st.st_size < self._offset:
+                    self._counts, self._inode, self._offset, self._column = {}, st.st_ino, 0, None
+                if st.st_size == self._offset:
+                    return
+                f.seek(self._offset)
+                data = f.read(st.st_size - self._offset)
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return
+        self._offset += end
+        rows = csv.reader(io.StringIO(data[:end].decode('utf-8'), newline=''))
+        if self._column is None:
+            self._column = next(rows).index('username')
+        for row in rows:
+            if len(row) > self._column:
+                self._counts[row[self._column]] = self._counts.get(row[self._column], 0) + 1
+
+    def count(self, username):
+        with self._lock:
+            self._catch_up()
+            return self._counts.get(username, 0)
+
+
+class _PendingUpdate:
+    def __init__(self, mutate):
+        self.mutate = mutate
+        self.done = False
+        self.error = None
+
+
+class CsvStorage(Storage):
+    """Flat-file backend. Whole-file rewrites are serialized per file with a
+    lock (an flock'd sidecar across processes), written to a temp file and
+    atomically renamed into place, and updates that queue up while a rewrite
+    is in progress are applied together in the next one."""
+
+    def __init__(self, data_dir=DATA_DIR, psych_columns=(), journal_interval=JOURNAL_INTERVAL):
+        self.data_dir = data_dir
+        self.psych_columns = [psych_column(c) for c in psych_columns]
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._pending = {}
+        self._appended_recommendations = 0
+        self.user_cache = UserCache(self._path('users.csv'), lambda: {row['username']: row for row in self._read('users.csv')})
+        self.journal = AppendJournal(self._append_rows, interval=journal_interval) if journal_interval > 0 else None
+        self.history_counts = RowCounts(self._path('history.csv'), lambda: self._file_lock('history.csv'))
+
+    def _path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def _thread_lock(self, name):
+        with self._locks_guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    @contextmanager
+    def _file_lock(self, name):
+        with self._thread_lock(name):
+            if fcntl is None:
+                yield
+                return
+            with open(self._path(name) + '.lock', 'a') as lockfile:
+                fcntl.flock(lockfile, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lockfile, fcntl.LOCK_UN)
+
+    def _read(self, name):
+        filename = self._path(name)
+        if not os.path.exists(filename):
+            return
+        with open(filename, mode='r', newline='', encoding='utf-8') as csvfile:
+            yield from csv.DictReader(csvfile)
+
+    def _append_rows(self, name, fieldnames, rows):
+        filename = self._path(name)
+        with self._file_lock(name):
+            file_exists = os.path.exists(filename)
+            with open(filename, mode='a', newline='', encoding='utf-8') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                if not file_exists:
+                    writer.writeheader()
+                writer.writerows(rows)
+                csvfile.flush()
+                os.fsync(csvfile.fileno())
+
+        if name == 'recommendations.csv':
+            self._appended_recommendations += len(rows)
+            if self._appended_recommendations >= COMPACT_RECOMMENDATIONS_AFTER:
+                try:
+                    self.compact_recommendations()
+                except Exception:
+                    logger.exception("Failed to compact recommendations.csv")
+
+    def _append(self, name, fieldnames, row):
+        self._append_rows(name, fieldnames, [row])
+
+    def _append_later(self, name, fieldnames, row):
+        if self.journal is None:
+            self._append(name, fieldnames, row)
+        else:
+            self.journal.append(name, fieldnames, {f: _text(row.get(f)) for f in fieldnames})
+
+    def _read_with_pending(self, name):
+        if self.journal is None:
+            return list(self._read(name))
+        return self.journal.snapshot(name, lambda: self._read(name))
+
+    def flush(self):
+        if self.journal is not None:
+            self.journal.flush()
+
+    def compact_recommendations(self):
+        self._appended_recommendations = 0
+        self._update('recommendations.csv', RECOMMENDATION_FIELDS, _latest_recommendations)
+
+    def _write_atomic(self, name, fieldnames, rows):
+        fd, tmp_path = tempfile.mkstemp(dir=self.data_dir or '.', prefix=f'.{name}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, mode='w', newline='', encoding='utf-8') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(rows)
+                csvfile.flush()
+                os.fsync(csvfile.fileno())
+            os.replace(tmp_path, self._path(name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _update(self, name, fieldnames, mutate):
+        """Rewrite a file as mutate(rows). Concurrent callers are batched:
+        whoever gets the file next applies every queued mutation in a single
+        read and rewrite."""
+        update = _PendingUpdate(mutate)
+        with self._locks_guard:
+            self._pending.setdefault(name, []).append(update)
+
+        with self._file_lock(name):
+            if not update.done:
+                with self._locks_guard:
+                    batch = self._pending.pop(name, [])
+                rows = list(self._read(name))
+                for pending in batch:
+                    try:
+                        rows = pending.mutate(rows)
+                    except Exception as e:
+                        pending.error = e
+                try:
+                    self._write_atomic(name, fieldnames, rows)
+                except Exception as e:
+                    for pending in batch:
+                        pending.error = pending.error or e
+                for pending in batch:
+                    pending.done = True
+
+        if update.error is not None:
+            raise update.error
+
+    def get_user(self, username):
+        user = self.user_cache.users().get(username)
+        return dict(user) if user is not None else None
+
+    def load_users(self):
+        return {username: dict(user) for username, user in self.user_cache.users().items()}
+
+    def save_user(self, user_data):
+        try:
+            self._append('users.csv', USER_FIELDS, user_data)
+        finally:
+            self.user_cache.invalidate()
+
+    def update_user(self, user_data):
+        def mutate(rows):
+            users = {row['username']: row for row in rows}
+            users[user_data['username']] = user_data
+            return list(users.values())
+        try:
+            self._update('users.csv', USER_FIELDS, mutate)
+        finally:
+            self.user_cache.invalidate()
+
+    def user_cache_stats(self):
+        return self.user_cache.stats()
+
+    def add_history(self, history_record):
+        self._append_later('history.csv', HISTORY_FIELDS, history_record)
+
+    def get_history(self, username):
+        return [row for _, row in self.iter_history(username)]
+
+    def all_history(self):
+        return self._read_with_pending('history.csv')
+
+    def _iter_appended(self, name):
+        """Yield (position, row) for an append-only file followed by its rows
+        still in the journal, reading the file lazily. A row's position is
+        its ordinal in the file, so it stays valid as a cursor once the row
+        is flushed (unless another process appends first)."""
+        def measure():
+            with self._file_lock(name):
+                try:
+                    f = open(self._path(name), 'rb')
+                except FileNotFoundError:
+                    return None, 0
+                return f, os.fstat(f.fileno()).st_size
+
+        if self.journal is None:
+            (f, size), pending = measure(), []
+        else:
+            (f, size), pending = self.journal.pending(name, measure)
+        position = -1
+        if f is not None:
+            with f:
+                for position, row in enumerate(csv.DictReader(_lines(f, size))):
+                    yield position, row
+        for position, row in enumerate(pending, start=position + 1):
+            yield position, row
+
+    def history_version(self, username):
+        # history.csv is append-only, so the user's row count in it covers
+        # every flushed row; their rows still in this process's journal are
+        # counted too.
+        if self.journal is None:
+            return str(self.history_counts.count(username))
+        count, pending = self.journal.pending('history.csv', lambda: self.history_counts.count(username))
+        pending = sum(1 for row in pending if row['username'] == username)
+        return f"{count}-{os.getpid()}.{pending}" if pending else str(count)
+
+    def iter_history(self, username, semester=None, cursor=None):
+        after = int(cursor) if cursor is not None else -1
+        for position, row in self._iter_appended('history.csv'):
+            if position > after and row['username'] == username and (
+                    semester is None or _semester_matches(row['semester'], semester)):
+                yield str(position), row
+
+    def save_recommendation(self, rec):
+        self._append_later('recommendations.csv', RECOMMENDATION_FIELDS, rec)
+
+    def get_recommendation(self, username, semester):
+        latest = None
+        for row in self._read_with_pending('recommendations.csv'):
+            try:
+                rec_sem = int(row['semester'])
+            except (ValueError, TypeError):
+                continue
+            if row['username'] == username and rec_sem == int(semester):
+                latest = row['recommended_courses']
+        return latest
+
+    def get_psych_eval(self, username):
+        for row in self._read('psych_eval.csv'):
+            if row['username'] == username:
+                return row
+        return {}
+
+    def set_psych_scores(self, username, scores):
+        def mutate(rows):
+            existing_data = {row['username']: row for row in rows}
+            existing_data.setdefault(username, {"username": username}).update(scores)
+            return list(existing_data.values())
+        self._update('psych_eval.csv', ['username'] + self.psych_columns, mutate)
+
+    def psych_version(self, username):
+        # psych_eval.csv is only ever replaced whole, by rename
+        try:
+            st = os.stat(self._path('psych_eval.csv'))
+        except FileNotFoundError:
+            return "0"
+        return f"{st.st_ino}-{st.st_size}-{st.st_mtime_ns}"
+
+    def get_skill_chart(self, username):
+        for row in self._read('skillcharts.csv'):
+            if row['username'] == username:
+                return {"skills": row['skills'], "profile": row.get('profile') or ""}
+        return None
+
+    def save_skill_chart(self, username, skills, profile=""):
+        def mutate(rows):
+            rows = [row for row in rows if row['username'] != username]
+            rows.append({"username": username, "skills": skills, "profile": profile})
+            return rows
+        self._update('skillcharts.csv', SKILLCHART_FIELDS, mutate)
+
+
+class SidecarDB:
+    """An SQLite file beside the data (caches, question bank, chat memory,
+    job queue) that every worker process on the host reads and writes.
+    Each process opens one connection on first use, in WAL mode and with
+    `schema` applied; callers serialize their use of it with a lock of
+    their own."""
+
+    def __init__(self, path, schema, row_factory=None):
+        self.path = path
+        self.schema = schema
+        self.row_factory = row_factory
+        self._conn = None
+
+    def connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.schema)
+            self._conn = conn
+        return self._conn
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT,
+    name TEXT,
+    age TEXT,
+    discipline TEXT,
+    current_semester TEXT,
+    career_goal TEXT
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    subject_code TEXT,
+    grade TEXT,
+    attendance TEXT,
+    semester TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_username_semester ON history (username, semester);
+CREATE INDEX IF NOT EXISTS idx_history_username_id ON history (username, id);
+CREATE TABLE IF NOT EXISTS recommendations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    semester INTEGER,
+    recommended_courses TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_recommendations_username_semester ON recommendations (username, semester);
+CREATE TABLE IF NOT EXISTS psych_eval (
+    username TEXT NOT NULL,
+    criterion TEXT NOT NULL,
+    score TEXT,
+    PRIMARY KEY (username, criterion)
+);
+CREATE TABLE IF NOT EXISTS skillcharts (
+    username TEXT PRIMARY KEY,
+    skills TEXT,
+    profile TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SqliteStorage(Storage):
+    """Storage in one SQLite file. Each process shares a pool of up to
+    pool_size connections between its threads; a call waits for a free one
+    rather than opening more."""
+
+    def __init__(self, path=DB_PATH, pool_size=POOL_SIZE):
+        self.path = path
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(pool_size)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            # Databases created before skill charts were cached per profile
+            columns = [row['name'] for row in conn.execute("PRAGMA table_info(skillcharts)")]
+            if 'profile' not in columns:
+                conn.execute("ALTER TABLE skillcharts ADD COLUMN profile TEXT")
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection for the duration of the block."""
+        with self._slots:
+            conn = self._idle.pop() if self._idle else self._open()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append(conn)
+
+    def _query(self, sql, params=()):
+        with self._connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=()):
+        with self._connection() as conn, conn:
+            conn.execute(sql, params)
+
+    def get_user(self, username):
+        rows = self._query("SELECT * FROM users WHERE username = ?", (username,))
+        return dict(rows[0]) if rows else None
+
+    def load_users(self):
+        return {row['username']: dict(row) for row in self._query("SELECT * FROM users")}
+
+    def save_user(self, user_data):
+        """Raises UserExistsError if the username is taken, including by a
+        registration that raced this one."""
+        try:
+            self._write(
+                "INSERT INTO users (username, password, name, age, discipline, current_semester, career_goal) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [_text(user_data.get(f)) for f in USER_FIELDS]
+            )
+        except sqlite3.IntegrityError:
+            raise UserExistsError(user_data.get('username'))
+
+    def update_user(self, user_data):
+        self._write(
+            "INSERT OR REPLACE INTO users (username, password, name, age, discipline, current_semester, career_goal) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [_text(user_data.get(f)) for f in USER_FIELDS]
+        )
+
+    def add_history(self, history_record):
+        self._write(
+            "INSERT INTO history (username, subject_code, grade, attendance, semester) VALUES (?, ?, ?, ?, ?)",
+            [_text(history_record.get(f)) for f in HISTORY_FIELDS]
+        )
+
+    def get_history(self, username):
+        rows = self._query(
+            "SELECT username, subject_code, grade, attendance, semester FROM history "
+            "WHERE username = ? ORDER BY id",
+            (username,)
+        )
+        return [dict(row) for row in rows]
+
+    def all_history(self):
+        rows = self._query("SELECT username, subject_code, grade, attendance, semester FROM history ORDER BY id")
+        return [dict(row) for row in rows]
+
+    def history_version(self, username):
+        rows = self._query("SELECT COUNT(*) AS n, MAX(id) AS last FROM history WHERE username = ?", (username,))
+        return f"{rows[0]['n']}-{rows[0]['last'] or 0}"
+
+    def iter_history(self, username, semester=None, cursor=None):
+        sql = "SELECT id, username, subject_code, grade, attendance, semester FROM history WHERE username = ? AND id > ?"
+        params = [username, int(cursor) if cursor is not None else 0]
+        if semester is not None:
+            sql += " AND semester = ?"
+            params.append(str(semester))
+        # Read in batches so a slow reader does not hold a pooled connection
+        while True:
+            rows = self._query(sql + f" ORDER BY id LIMIT {ITER_BATCH_SIZE}", params)
+            for row in rows:
+                record = dict(row)
+                yield str(record.pop('id')), record
+            if len(rows) < ITER_BATCH_SIZE:
+                return
+            params[1] = rows[-1]['id']
+
+    def save_recommendation(self, rec):
+        with self._connection() as conn, conn:
+            conn.execute(
+                "DELETE FROM recommendations WHERE username = ? AND semester = ?",
+                (rec['username'], int(rec['semester']))
+            )
+            conn.execute(
+                "INSERT INTO recommendations (username, semester, recommended_courses) VALUES (?, ?, ?)",
+                (rec['username'], int(rec['semester']), _text(rec.get('recommended_courses')))
+            )
+
+    def get_recommendation(self, username, semester):
+        rows = self._query(
+            "SELECT recommended_courses FROM recommendations WHERE username = ? AND semester = ? "
+            "ORDER BY id DESC LIMIT 1",
+            (username, int(semester))
+        )
+        return rows[0]['recommended_courses'] if rows else None
+
+    def get_psych_eval(self, username):
+        rows = self._query("SELECT criterion, score FROM psych_eval WHERE username = ?", (username,))
+        if not rows:
+            return {}
+        result = {"username": username}
+        result.update((row['criterion'], row['score']) for row in rows)
+        return result
+
+    def set_psych_scores(self, username, scores):
+        with self._connection() as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO psych_eval (username, criterion, score) VALUES (?, ?, ?)",
+                [(username, criterion, _text(score)) for criterion, score in scores.items()]
+            )
+
+    def psych_version(self, username):
+        rows = self._query(
+            "SELECT group_concat(criterion || '=' || score, ';') AS scores FROM psych_eval WHERE username = ?",
+            (username,)
+        )
+        return rows[0]['scores'] or ""
+
+    def get_skill_chart(self, username):
+        rows = self._query("SELECT skills, profile FROM skillcharts WHERE username = ?", (username,))
+        return {"skills": rows[0]['skills'], "profile": rows[0]['profile'] or ""} if rows else None
+
+    def save_skill_chart(self, username, skills, profile=""):
+        self._write(
+            "INSERT OR REPLACE INTO skillcharts (username, skills, profile) VALUES (?, ?, ?)",
+            (username, skills, profile)
+        )
+
+
+def migrate_csv_to_sqlite(source, target, force=False):
+    """Copy every CSV record into the SQLite database once. Returns the
+    number of rows copied per table, or None if the database was already
+    migrated and force is not set."""
+    with target._connection() as conn:
+        done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_csv'").fetchone()
+        if done and not force:
+            return None
+
+        counts = {}
+        with conn:
+            for table in ('users', 'history', 'recommendations', 'psych_eval', 'skillcharts'):
+                conn.execute(f"DELETE FROM {table}")
+
+            users = list(source._read('users.csv'))
+            conn.executemany(
+                "INSERT OR REPLACE INTO users (username, password, name, age, discipline, current_semester, career_goal) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [[_text(row.get(f)) for f in USER_FIELDS] for row in users]
+            )
+            counts['users'] = len(users)
+
+            history = source._read_with_pending('history.csv')
+            conn.executemany(
+                "INSERT INTO history (username, subject_code, grade, attendance, semester) VALUES (?, ?, ?, ?, ?)",
+                [[_text(row.get(f)) for f in HISTORY_FIELDS] for row in history]
+            )
+            counts['history'] = len(history)
+
+            recommendations = []
+            for row in _latest_recommendations(source._read_with_pending('recommendations.csv')):
+                try:
+                    recommendations.append((row['username'], int(row['semester']), _text(row.get('recommended_courses'))))
+                except (ValueError, TypeError):
+                    continue
+            conn.executemany(
+                "INSERT INTO recommendations (username, semester, recommended_courses) VALUES (?, ?, ?)",
+                recommendations
+            )
+            counts['recommendations'] = len(recommendations)
+
+            scores = []
+            for row in source._read('psych_eval.csv'):
+                for criterion, score in row.items():
+                    if criterion != 'username' and score not in (None, ''):
+                        scores.append((row['username'], criterion, score))
+            conn.executemany("INSERT OR REPLACE INTO psych_eval (username, criterion, score) VALUES (?, ?, ?)", scores)
+            counts['psych_eval'] = len(scores)
+
+            charts = [(row['username'], row['skills'], row.get('profile') or "") for row in source._read('skillcharts.csv')]
+            conn.executemany("INSERT OR REPLACE INTO skillcharts (username, skills, profile) VALUES (?, ?, ?)", charts)
+            counts['skillcharts'] = len(charts)
+
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_csv', datetime('now'))")
+        return counts
+
+
+def get_storage(psych_columns=()):
+    if STORAGE_BACKEND == "sqlite":
+        return SqliteStorage(DB_PATH)
+    return CsvStorage(DATA_DIR, psych_columns)
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from storage import CsvStorage, psych_column
+
+CRITERIA = ["Curiosity", "Motivation", "Adaptability"]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return CsvStorage(str(tmp_path), psych_columns=CRITERIA, journal_interval=0)
+
+
+def user(username, **fields):
+    return {"username": username, "password": "p", "name": username, "age": "20",
+            "discipline": "FYUGP Physics", "current_semester": "2", "career_goal": "Physicist", **fields}
+
+
+def run_together(calls):
+    start = threading.Barrier(len(calls))
+    errors = []
+
+    def run(call):
+        start.wait()
+        try:
+            call()
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=run, args=(call,)) for call in calls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def slow_writes(storage, monkeypatch):
+    """Count rewrites and make each one slow enough for callers to queue up."""
+    writes = []
+    write = storage._write_atomic
+
+    def slow(name, fieldnames, rows):
+        writes.append(name)
+        time.sleep(0.02)
+        write(name, fieldnames, rows)
+    monkeypatch.setattr(storage, "_write_atomic", slow)
+    return writes
+
+
+def test_concurrent_profile_updates_are_batched_and_none_lost(storage, monkeypatch):
+    for i in range(50):
+        storage.save_user(user(f"u{i}"))
+    writes = slow_writes(storage, monkeypatch)
+
+    errors = run_together([
+        lambda i=i: storage.update_user(user(f"u{i}", career_goal=f"goal {i}")) for i in range(50)
+    ])
+
+    assert errors == []
+    users = storage.load_users()
+    assert len(users) == 50
+    assert all(users[f"u{i}"]["career_goal"] == f"goal {i}" for i in range(50))
+    assert len(writes) < 50
+
+
+def test_concurrent_psych_scores_for_one_user_are_merged(storage, monkeypatch):
+    slow_writes(storage, monkeypatch)
+
+    errors = run_together([
+        lambda i=i: storage.set_psych_scores("u0", {psych_column(CRITERIA[i % 3]): str(i)}) for i in range(30)
+    ] + [
+        lambda i=i: storage.set_psych_scores(f"other{i}", {psych_column("Curiosity"): "1"}) for i in range(20)
+    ])
+
+    assert errors == []
+    row = storage.get_psych_eval("u0")
+    assert all(row[psych_column(criterion)] for criterion in CRITERIA)
+    assert all(storage.get_psych_eval(f"other{i}") for i in range(20))
+
+
+def test_failed_mutation_only_fails_its_own_caller(storage, monkeypatch):
+    storage.save_user(user("u0"))
+    slow_writes(storage, monkeypatch)
+
+    def broken(rows):
+        raise ValueError("broken")
+
+    errors = run_together([
+        lambda: storage._update("users.csv", list(user("x")), broken),
+        lambda: storage.update_user(user("u0", career_goal="Astronomer")),
+    ])
+
+    assert [str(e) for e in errors] == ["broken"]
+    assert storage.get_user("u0")["career_goal"] == "Astronomer"
+
+
+def test_rewrite_leaves_no_temp_files(storage, tmp_path):
+    storage.save_user(user("u0"))
+    storage.update_user(user("u0", age="21"))
+    storage.save_skill_chart("u0", "{}", "profile")
+
+    assert storage.get_user("u0")["age"] == "21"
+    assert not [path.name for path in tmp_path.iterdir() if path.name.endswith(".tmp")]
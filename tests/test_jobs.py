@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import jobs
+from jobs import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(path=str(tmp_path / "jobs.db"), workers=2)
+
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_duplicate_submission_returns_the_pending_job(queue):
+    release = threading.Event()
+    calls = []
+
+    def handler(params):
+        calls.append(params)
+        release.wait(5)
+        return {"value": params["n"]}, 200
+    queue.register("work", handler)
+
+    first, created = queue.submit("work", "u0", 2, {"n": 1})
+    second, created_again = queue.submit("work", "u0", 2, {"n": 2})
+    other, created_other = queue.submit("work", "u0", 3, {"n": 3})
+    release.set()
+
+    assert created and not created_again and created_other
+    assert second["id"] == first["id"] != other["id"]
+    assert wait_for(queue, first["id"])["result"] == {"value": 1}
+    wait_for(queue, other["id"])
+    assert sorted(params["n"] for params in calls) == [1, 3]
+
+    # Once finished, the same work can be queued again
+    again, created = queue.submit("work", "u0", 2, {"n": 4})
+    assert created and again["id"] != first["id"]
+    assert wait_for(queue, again["id"])["result"] == {"value": 4}
+
+
+def test_error_status_and_exceptions_fail_the_job(queue):
+    queue.register("refused", lambda params: ({"error": "Upstream failed."}, 502))
+    queue.register("broken", lambda params: 1 / 0)
+
+    refused, _ = queue.submit("refused", "u0", None, {})
+    broken, _ = queue.submit("broken", "u0", None, {})
+    unknown, _ = queue.submit("unknown", "u0", None, {})
+
+    assert wait_for(queue, refused["id"])["error"] == "Upstream failed."
+    assert wait_for(queue, broken["id"])["error"] == "Job failed."
+    assert wait_for(queue, unknown["id"])["error"] == "Unknown job kind: unknown"
+
+
+def insert_job(path, job_id, status, updated_at, attempts, owner=None):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, username, semester, params, status, attempts, owner, heartbeat, "
+            "created_at, updated_at) VALUES (?, 'work', ?, '', ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, job_id, json.dumps({"n": job_id}), status, attempts, owner, updated_at, updated_at, updated_at)
+        )
+    conn.close()
+
+
+def dead_owner():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return f"{jobs.HOST}:{process.pid}:gone"
+
+
+def test_recover_reruns_jobs_left_by_a_dead_process(queue):
+    queue._connection()  # create the table
+    stale = time.time() - jobs.STALE_AFTER - 1
+    insert_job(queue.path, "stale", "running", stale, 1)
+    insert_job(queue.path, "exhausted", "running", stale, jobs.MAX_ATTEMPTS)
+    insert_job(queue.path, "queued", "queued", time.time(), 0)
+    insert_job(queue.path, "busy", "running", time.time(), 1, owner=f"{jobs.HOST}:{os.getppid()}:parent")
+
+    # A fresh process picks the table up
+    restarted = JobQueue(path=queue.path, workers=2)
+    restarted.register("work", lambda params: ({"n": params["n"]}, 200))
+
+    assert restarted.recover() == 2
+    assert wait_for(restarted, "stale")["result"] == {"n": "stale"}
+    assert wait_for(restarted, "queued")["result"] == {"n": "queued"}
+    assert restarted.get("exhausted")["error"] == "Job timed out."
+    assert restarted.get("busy")["status"] == "running"
+
+
+def test_a_job_is_run_once_when_several_processes_recover(queue):
+    queue._connection()
+    insert_job(queue.path, "queued", "queued", time.time(), 0)
+    runs = []
+    queues = [JobQueue(path=queue.path, workers=1) for _ in range(3)]
+    for q in queues:
+        q.register("work", lambda params: (runs.append(params) or {}, 200))
+
+    for q in queues:
+        q.recover()
+
+    assert wait_for(queue, "queued")["status"] == "done"
+    time.sleep(0.1)
+    assert len(runs) == 1
+
+
+def test_a_poll_takes_over_a_job_whose_process_died(queue):
+    queue._connection()
+    insert_job(queue.path, "orphan", "running", time.time(), 1, owner=dead_owner())
+    queue.register("work", lambda params: ({"n": params["n"]}, 200))
+
+    assert queue.get("orphan")["status"] in ("queued", "running", "done")
+    assert wait_for(queue, "orphan")["result"] == {"n": "orphan"}
+
+
+def test_submitting_replaces_a_job_whose_process_died(queue):
+    queue._connection()
+    insert_job(queue.path, "orphan", "running", time.time(), 1, owner=dead_owner())
+    queue.register("work", lambda params: ({"n": params["n"]}, 200))
+
+    job, created = queue.submit("work", "orphan", None, {"n": 1})
+
+    assert created and job["id"] != "orphan"
+    assert wait_for(queue, job["id"])["result"] == {"n": 1}
+    assert queue.get("orphan")["error"] == "Job was interrupted."
@@ -0,0 +1,111 @@
+import csv
+import threading
+
+import pytest
+
+import storage as storage_module
+from journal import AppendJournal
+from storage import CsvStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    # A long interval keeps rows in the journal until a test flushes them
+    csv_storage = CsvStorage(str(tmp_path), journal_interval=60)
+    yield csv_storage
+    csv_storage.journal.close()
+
+
+def history(username, code, semester=1):
+    return {"username": username, "subject_code": code, "grade": "8", "attendance": "90", "semester": str(semester)}
+
+
+def file_rows(path):
+    if not path.exists():
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_history_is_readable_before_and_after_flush(storage, tmp_path):
+    storage.add_history(history("u0", "A"))
+    storage.add_history(history("u1", "B"))
+    storage.add_history(history("u0", "C", semester=2))
+
+    assert file_rows(tmp_path / "history.csv") == []
+    assert [row["subject_code"] for row in storage.get_history("u0")] == ["A", "C"]
+
+    storage.flush()
+
+    assert len(file_rows(tmp_path / "history.csv")) == 3
+    assert [row["subject_code"] for row in storage.get_history("u0")] == ["A", "C"]
+    assert [row["subject_code"] for _, row in storage.iter_history("u0", semester=2)] == ["C"]
+
+
+def test_history_cursor_survives_a_flush(storage):
+    for code in "ABCD":
+        storage.add_history(history("u0", code))
+    records, cursor = storage.history_page("u0", limit=2)
+    storage.flush()
+    rest, last = storage.history_page("u0", cursor=cursor, limit=2)
+
+    assert [row["subject_code"] for row in records + rest] == list("ABCD")
+    assert last is None
+
+
+def test_history_version_is_per_user(storage):
+    before = storage.history_version("u0")
+    storage.add_history(history("u1", "B"))
+    assert storage.history_version("u0") == before
+
+    storage.add_history(history("u0", "A"))
+    pending = storage.history_version("u0")
+    assert pending != before
+    storage.flush()
+    flushed = storage.history_version("u0")
+    assert flushed not in (before, pending)
+
+    # Rows appended by another process count too
+    CsvStorage(storage.data_dir, journal_interval=0).add_history(history("u0", "C"))
+    assert storage.history_version("u0") != flushed
+
+
+def test_recommendation_is_readable_before_flush(storage):
+    storage.save_recommendation({"username": "u0", "semester": "2", "recommended_courses": "old"})
+    storage.flush()
+    storage.save_recommendation({"username": "u0", "semester": "2", "recommended_courses": "new"})
+
+    assert storage.get_recommendation("u0", 2) == "new"
+
+
+def test_recommendations_are_compacted_to_the_latest_per_semester(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_module, "COMPACT_RECOMMENDATIONS_AFTER", 5)
+    csv_storage = CsvStorage(str(tmp_path), journal_interval=0)
+    for i in range(4):
+        csv_storage.save_recommendation({"username": "u0", "semester": "2", "recommended_courses": f"v{i}"})
+    csv_storage.save_recommendation({"username": "u1", "semester": "2", "recommended_courses": "only"})
+
+    rows = file_rows(tmp_path / "recommendations.csv")
+    assert [(row["username"], row["recommended_courses"]) for row in rows] == [("u0", "v3"), ("u1", "only")]
+    assert csv_storage.get_recommendation("u0", 2) == "v3"
+
+
+def test_snapshot_sees_each_row_once_while_flushing():
+    written = []
+    journal = AppendJournal(lambda name, fieldnames, rows: written.extend(rows), interval=60)
+    stop = threading.Event()
+
+    def flush_repeatedly():
+        while not stop.is_set():
+            journal.flush()
+    flusher = threading.Thread(target=flush_repeatedly)
+    flusher.start()
+    try:
+        for i in range(200):
+            journal.append("rows.csv", ["n"], {"n": i})
+            seen = [row["n"] for row in journal.snapshot("rows.csv", lambda: list(written))]
+            assert seen == list(range(i + 1))
+    finally:
+        stop.set()
+        flusher.join()
+        journal.close()
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from storage import SqliteStorage, UserExistsError
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return SqliteStorage(str(tmp_path / "edusync.db"))
+
+
+def user(username, **fields):
+    return {"username": username, "password": "p", "name": username, "age": "20",
+            "discipline": "FYUGP Physics", "current_semester": "2", "career_goal": "Physicist", **fields}
+
+
+def test_registering_a_taken_username_raises(storage):
+    storage.save_user(user("u0"))
+
+    with pytest.raises(UserExistsError):
+        storage.save_user(user("u0", name="Someone else"))
+    assert storage.get_user("u0")["name"] == "u0"
+
+
+def test_threads_share_the_connection_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr("storage.ITER_BATCH_SIZE", 3)
+    storage = SqliteStorage(str(tmp_path / "edusync.db"), pool_size=2)
+    storage.save_user(user("u0"))
+    for i in range(7):
+        storage.add_history({"username": "u0", "subject_code": f"C{i}", "grade": "80",
+                             "attendance": "90", "semester": "1"})
+
+    def read(_):
+        return [record["subject_code"] for _, record in storage.iter_history("u0")]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(read, range(32)))
+
+    assert results == [[f"C{i}" for i in range(7)]] * 32
+    assert len(storage._idle) <= 2
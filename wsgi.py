@@ -0,0 +1,21 @@
+# Patch blocking I/O (sockets, threads, sleep) before anything else is
+# imported so requests, the LLM thread pool and the journal thread all run
+# as greenlets.
+from gevent import monkey
+monkey.patch_all()
+
+import os
+
+from app import app
+
+if __name__ == '__main__':
+    import socket
+    from gevent.pywsgi import WSGIServer
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # Accepted connections inherit this; without it small responses on a
+    # kept-alive connection stall ~40ms on Nagle and delayed ACKs.
+    listener.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    listener.bind(('0.0.0.0', int(os.environ.get('PORT', '5000'))))
+    listener.listen(socket.SOMAXCONN)
+    WSGIServer(listener, app).serve_forever()